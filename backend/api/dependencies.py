@@ -3,7 +3,12 @@ API Dependencies
 Shared dependencies for FastAPI routes
 """
 from typing import Generator
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
 from backend.db.repository import DatabaseRepository, get_repository
+from backend.db.engine import get_db_engine
+from backend.db.repository_orm import DatabaseRepository as OrmRepository
 
 
 def get_db() -> Generator[DatabaseRepository, None, None]:
@@ -13,3 +18,21 @@ def get_db() -> Generator[DatabaseRepository, None, None]:
         yield db
     finally:
         pass  # Repository handles its own cleanup
+
+
+def get_session() -> Generator[Session, None, None]:
+    """Dependency yielding one ORM session for the whole request"""
+    session = get_db_engine().session_factory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def get_repo(session: Session = Depends(get_session)) -> OrmRepository:
+    """Dependency to get an ORM repository bound to the request session"""
+    return OrmRepository(session=session)
@@ -2,13 +2,14 @@
 Monte Carlo Evaluation API Router
 Provides endpoints for retrieving evaluation history and results
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import logging
 
 from backend.services.evaluation_service import MonteCarloEvaluationService
-from backend.db.repository_orm import get_repository
+from backend.db.repository_orm import DatabaseRepository
+from backend.api.dependencies import get_repo
 
 logger = logging.getLogger(__name__)
 
@@ -40,14 +41,16 @@ async def get_evaluation_history(
 
 
 @router.get("/evaluations/{evaluation_id}")
-async def get_evaluation_detail(evaluation_id: int) -> Dict[str, Any]:
+async def get_evaluation_detail(
+    evaluation_id: int,
+    repo: DatabaseRepository = Depends(get_repo)
+) -> Dict[str, Any]:
     """
     Get detailed results for a specific Monte Carlo evaluation
     
     Returns full evaluation data including histogram and all samples.
     """
     try:
-        repo = get_repository()
         evaluation = repo.get_monte_carlo_evaluation(evaluation_id)
         
         if not evaluation:
@@ -104,7 +107,8 @@ async def run_evaluation(
     max_length: int = Query(default=200, description="Maximum length of generated text"),
     temperature: float = Query(default=0.8, description="Temperature for generation"),
     neural_weight: float = Query(default=0.5, description="Weight for neural model"),
-    markov_weight: float = Query(default=0.5, description="Weight for Markov model")
+    markov_weight: float = Query(default=0.5, description="Weight for Markov model"),
+    repo: DatabaseRepository = Depends(get_repo)
 ) -> Dict[str, Any]:
     """
     Run a new Monte Carlo evaluation
@@ -115,7 +119,6 @@ async def run_evaluation(
         service = MonteCarloEvaluationService()
         
         # Get the current best checkpoint
-        repo = get_repository()
         best_checkpoint = repo.get_best_checkpoint()
         checkpoint_id = best_checkpoint.id if best_checkpoint else None
         
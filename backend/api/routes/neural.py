@@ -35,7 +35,7 @@ async def get_neural_configs(
     """Get all saved neural configurations"""
     configs = db.get_neural_configs()
     items = [
-        SavedNeuralConfig(
+        SavedNeuralConfig.model_construct(
             id=c["id"],
             name=c["name"],
             config=c["config"],
@@ -44,7 +44,7 @@ async def get_neural_configs(
         )
         for c in configs
     ]
-    return NeuralConfigList(configs=items)
+    return NeuralConfigList.model_construct(configs=items)
 
 
 @router.delete("/neural-config/{config_id}")
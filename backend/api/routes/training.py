@@ -14,6 +14,7 @@ from backend.schemas.training import (
 from backend.api.dependencies import get_db
 from backend.db.repository import DatabaseRepository
 from backend.services.job_runner import launch_job, get_job
+from backend.services import ingest_service
 from backend.services.training_service import get_training_statistics
 from datetime import datetime
 
@@ -43,17 +44,19 @@ async def get_training_progress(job_id: str) -> TrainingProgress:
 
 
 @router.post("/text", response_model=TextInputResponse)
-async def add_text(
-    text_input: TextInput,
-    db: DatabaseRepository = Depends(get_db)
-) -> TextInputResponse:
+async def add_text(text_input: TextInput) -> TextInputResponse:
     """Add text to corpus"""
-    text_id = db.add_text(
-        content=text_input.content,
-        title=text_input.title,
-        source=text_input.source,
-        metadata=text_input.metadata
-    )
+    try:
+        text_id = await ingest_service.add_text(
+            content=text_input.content,
+            title=text_input.title,
+            source=text_input.source,
+            metadata=text_input.metadata
+        )
+    except (RuntimeError, asyncio.QueueFull) as e:
+        raise HTTPException(status_code=503, detail=f"Corpus ingest unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to add text: {e}")
     return TextInputResponse(id=text_id, message="Text added successfully")
 
 
@@ -65,7 +68,7 @@ async def get_texts(
     """Get texts from corpus"""
     texts = db.get_texts(limit)
     items = [
-        TextCorpusItem(
+        TextCorpusItem.model_construct(
             id=t["id"],
             title=t["title"],
             content=t["content"],
@@ -75,7 +78,7 @@ async def get_texts(
         )
         for t in texts
     ]
-    return TextCorpusList(texts=items)
+    return TextCorpusList.model_construct(texts=items)
 
 
 @router.delete("/text/{text_id}")
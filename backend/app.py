@@ -23,6 +23,13 @@ import asyncio
 import logging
 import time
 
+# Generation responses carry a boolean per word; orjson serializes those much faster
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as GenerationResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as GenerationResponse
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
@@ -136,6 +143,12 @@ class GenerateRequest(BaseModel):
     trigram_weight: float = 0.3
     tetragram_weight: float = 0.5
 
+class GenerateBatchRequest(GenerateRequest):
+    runs: int = 10  # independent generations in the batch
+
+# Most runs one batched generation request may ask for
+MAX_BATCH_RUNS = 1000
+
 class MonteCarloRequest(BaseModel):
     num_simulations: int
     confidence_level: int
@@ -146,90 +159,29 @@ class MonteCarloRequest(BaseModel):
 
 # API Routes
 from backend.services.job_runner import launch_job, get_job
-from backend.services.generation_service import generate_text
-from backend.services.evaluation_service import get_evaluation_history as get_eval_history
-# Word validation: prefer pyenchant if available; else fall back to wordfreq or heuristic
-# Try to help PyEnchant find the system library on macOS (Homebrew path on Apple Silicon)
-import re
+from backend.services.generation_service import generate_text, generate_text_batch, invalidate_generation_cache
+from backend.services.evaluation_service import (
+    get_evaluation_history as get_eval_history,
+    init_evaluation_table
+)
+# Word validation: the shared validator, so generated-text masks and Monte Carlo scores agree
+from backend.utils.word_validation import get_validator
 import logging
 
 logger = logging.getLogger(__name__)
 
-for cand in ["/opt/homebrew/lib/libenchant-2.dylib", "/usr/local/lib/libenchant-2.dylib"]:
-    if os.path.exists(cand):
-        os.environ.setdefault("PYENCHANT_LIBRARY_PATH", cand)
-        logger.info(f"Found enchant library at: {cand}")
-        break
-
-WORD_CHECKER = None
-CHECKER_TYPE = "none"
-
-try:
-    import enchant  # type: ignore
-    _en_dict = enchant.Dict("en_US")
-    WORD_CHECKER = _en_dict
-    CHECKER_TYPE = "enchant"
-    logger.info("Using PyEnchant for word validation")
-    print("Word validation: Using PyEnchant")
-except Exception as e:
-    logger.warning(f"PyEnchant not available: {e}")
-    try:
-        from wordfreq import zipf_frequency  # type: ignore
-        WORD_CHECKER = zipf_frequency
-        CHECKER_TYPE = "wordfreq"
-        logger.info("Using wordfreq for word validation")
-        print("Word validation: Using wordfreq")
-    except Exception as e2:
-        logger.warning(f"wordfreq not available: {e2}")
-        CHECKER_TYPE = "basic"
-        logger.info("Using basic word list for validation")
-        print("Word validation: Using basic word list")
-
-# Common short words that should be allowed
-ALLOWED_SHORT = {"a","i","an","in","on","to","of","is","as","at","be","he","we","us","it","or","by","so","if","me","my","up","no","do","go"}
-
-# Extended common word list for fallback
-COMMON_WORDS = {
-    "the","and","to","of","in","a","that","is","it","for","on","with","as","at","by","an","be",
-    "this","was","are","have","been","from","or","had","but","what","were","we","when","there",
-    "can","all","your","which","their","said","if","will","do","each","about","how","up","out",
-    "them","then","she","many","some","so","these","would","other","into","has","more","her","two",
-    "like","him","see","time","could","no","just","than","only","its","now","my","over","made",
-    "after","also","did","years","much","way","who","through","where","back","any","our","may",
-    "well","down","should","because","each","those","people","state","very","world","still","own",
-    "me","work","life","being","use","day","same","part","while","he","us","go","get","come"
-}
+_word_validator = get_validator()
+logger.info(f"Word validation: using {_word_validator.checker_type}")
+print(f"Word validation: Using {_word_validator.checker_type}")
 
 def _check_word(w: str) -> bool:
     """Check if a word is valid English"""
-    # Clean the word - remove punctuation except apostrophes
-    clean = re.sub(r"[^A-Za-z']", "", w)
-    if not clean:
-        return False
-    
-    word_lower = clean.lower()
-    
-    # Check short words against allowed list
-    if len(word_lower) <= 2:
-        result = word_lower in ALLOWED_SHORT
-        logger.debug(f"Short word '{w}' ({word_lower}): {result}")
-        return result
-    
-    # Use the appropriate checker
-    if CHECKER_TYPE == "enchant" and WORD_CHECKER:
-        result = WORD_CHECKER.check(word_lower)
-        logger.debug(f"Enchant check '{w}' ({word_lower}): {result}")
-        return result
-    elif CHECKER_TYPE == "wordfreq" and WORD_CHECKER:
-        freq = WORD_CHECKER(word_lower, "en")
-        result = freq >= 3.0  # Lower threshold for more acceptance
-        logger.debug(f"Wordfreq check '{w}' ({word_lower}): freq={freq}, valid={result}")
-        return result
-    else:
-        # Fallback to basic word list
-        result = word_lower in COMMON_WORDS
-        logger.debug(f"Basic check '{w}' ({word_lower}): {result}")
-        return result
+    return _word_validator.check_word(w)
+
+@app.on_event("startup")
+async def startup_event():
+    """Create the Monte Carlo evaluation table"""
+    init_evaluation_table()
 
 @app.get("/")
 async def root():
@@ -341,8 +293,10 @@ async def training_progress(job_id: str):
     return job
 
 # Generation endpoint (hybrid Markov + neural)
-@app.post("/api/generate")
-async def generate_text_api(request: GenerateRequest):
+# Plain def: FastAPI runs these in its threadpool, so concurrent generations
+# overlap instead of each blocking the event loop
+@app.post("/api/generate", response_class=GenerationResponse)
+def generate_text_api(request: GenerateRequest):
     # Use empty string if prompt is None
     prompt = request.prompt or ""
     
@@ -390,6 +344,45 @@ async def generate_text_api(request: GenerateRequest):
 
     return {"generated_text": text, "valid_mask": valid_mask}
 
+# Batched generation: every run is produced by one lock-step pass, so the
+# neural model runs once per character for the whole batch
+@app.post("/api/generate_batch", response_class=GenerationResponse)
+def generate_batch_api(request: GenerateBatchRequest):
+    if not 1 <= request.runs <= MAX_BATCH_RUNS:
+        raise HTTPException(status_code=400, detail=f"runs must be between 1 and {MAX_BATCH_RUNS}")
+    prompt = request.prompt or ""
+    
+    texts = generate_text_batch(
+        n_chars=request.max_tokens,
+        batch_size=request.runs,
+        prompt=prompt,
+        bigram_weight=request.bigram_weight,
+        trigram_weight=request.trigram_weight,
+        tetragram_weight=request.tetragram_weight,
+        neural_weight=request.neural_weight,
+        temperature=request.temperature,
+    )
+    results = [
+        {"generated_text": text, "valid_mask": [_check_word(w) for w in text.split()]}
+        for text in texts
+    ]
+    
+    # Save to history, one row per run as /api/generate would
+    parameters = json.dumps({
+        "temperature": request.temperature,
+        "max_tokens": request.max_tokens,
+        "top_p": request.top_p
+    })
+    conn = sqlite3.connect(DATABASE_PATH)
+    conn.executemany(
+        "INSERT INTO generation_history (prompt, response, model, parameters) VALUES (?, ?, ?, ?)",
+        [(prompt, text, request.model, parameters) for text in texts]
+    )
+    conn.commit()
+    conn.close()
+    
+    return {"results": results}
+
 # Monte Carlo Evaluation endpoints
 @app.get("/api/evaluation/evaluations")
 async def get_evaluation_history(
@@ -697,8 +690,8 @@ def clear_all_training_data():
         from sqlalchemy import text
         repo = get_repository()
         
-        # Clear all training-related tables
-        with repo.session_factory() as session:
+        # Clear all training-related tables in one transaction, committed when the scope exits
+        with repo._session_scope() as session:
             # Delete all corpus texts
             session.execute(text("DELETE FROM text_corpus"))
             # Delete all checkpoints  
@@ -706,12 +699,17 @@ def clear_all_training_data():
             # Delete all markov ngrams
             session.execute(text("DELETE FROM markov_ngrams"))
             # Delete all accuracy records
-            session.execute(text("DELETE FROM accuracy_records"))
-            session.commit()
-            
+            session.execute(text("DELETE FROM accuracy_metrics"))
+        # Only once the deletes are committed: drop cached checkpoints, Markov tables and models
+        repo.cache.clear()
+        invalidate_generation_cache()
+        
         return {"status": "success", "message": "All training data cleared"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 if __name__ == "__main__":
+    # Monte Carlo workers are spawned processes; needed when running frozen
+    import multiprocessing
+    multiprocessing.freeze_support()
     uvicorn.run(app, host="127.0.0.1", port=PORT, log_level="info")
@@ -67,6 +67,17 @@ async def startup_event():
         init_sqlalchemy()
     except Exception as e:
         print(f"Warning: SQLAlchemy init failed: {e}")
+    
+    # Start the background corpus ingest worker
+    from backend.services import ingest_service
+    ingest_service.start_worker()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued corpus texts before exiting"""
+    from backend.services import ingest_service
+    await ingest_service.stop_worker()
 
 
 # Root endpoint
@@ -0,0 +1,147 @@
+"""
+Repository Cache
+In-process LRU + TTL cache for hot, rarely-changing point reads
+"""
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class IntelligentCache:
+    """Thread-safe LRU cache with per-entry TTL and tag based invalidation"""
+
+    def __init__(self, max_size: int = 256, default_ttl: float = 60.0):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        # Bumped on every invalidation, so a read that started before one cannot store its result
+        self._generations: Dict[str, int] = {}
+        self._clears = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, tag: Optional[str] = None) -> Tuple[int, int]:
+        """Invalidation counter for a tag; pass it to set() to drop values read before an invalidation"""
+        with self._lock:
+            return self._clears, self._generations.get(tag, 0)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        tag: Optional[str] = None,
+        generation: Optional[Tuple[int, int]] = None
+    ):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            if generation is not None and generation != (self._clears, self._generations.get(tag, 0)):
+                # Invalidated while the value was being read; it may already be stale
+                return
+            ttl = self.default_ttl if ttl is None else ttl
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            if tag:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry"""
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_tag(self, tag: str):
+        """Drop every entry stored under the given tag"""
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in self._tags.pop(tag, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._clears += 1
+
+    def stats(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _discard(self, key: Hashable):
+        self._entries.pop(key, None)
+        for keys in self._tags.values():
+            keys.discard(key)
+
+
+# Shared cache for repository lookups
+repository_cache = IntelligentCache()
+
+
+def cached(
+    ttl: Optional[float] = None,
+    key: Optional[Callable[..., Hashable]] = None,
+    tag: Optional[str] = None,
+    cache: IntelligentCache = repository_cache,
+    bypass: Optional[Callable[..., bool]] = None
+):
+    """
+    Cache a method's return value
+
+    Args:
+        ttl: Seconds before an entry expires (defaults to the cache TTL)
+        key: Builds the cache key from the call arguments
+        tag: Invalidation group the entry belongs to
+        cache: Cache instance to store entries in
+        bypass: Returns True for calls that must neither read nor fill the cache
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if bypass is not None and bypass(*args, **kwargs):
+                return func(*args, **kwargs)
+            cache_key = key(*args, **kwargs) if key else (func.__qualname__, args[1:], tuple(sorted(kwargs.items())))
+            value = cache.get(cache_key, _MISSING)
+            if value is _MISSING:
+                generation = cache.generation(tag)
+                value = func(*args, **kwargs)
+                cache.set(cache_key, value, ttl=ttl, tag=tag, generation=generation)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -26,6 +26,7 @@ class DatabaseConfig:
         self.pool_recycle = int(os.getenv('DB_POOL_RECYCLE', '3600'))
         self.echo = os.getenv('DB_ECHO', 'false').lower() == 'true'
         self.use_pool = os.getenv('DB_USE_POOL', 'true').lower() == 'true'
+        self.query_cache_size = int(os.getenv('DB_QUERY_CACHE_SIZE', '2000'))
     
     def _get_database_url(self) -> str:
         """Get database URL from environment or default"""
@@ -101,6 +102,7 @@ class DatabaseEngine:
             echo=self.config.echo,
             poolclass=poolclass,
             connect_args=connect_args,
+            query_cache_size=self.config.query_cache_size,
             **pool_kwargs
         )
         
@@ -6,7 +6,7 @@ import os
 import logging
 from typing import List, Callable, Dict, Any
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from backend.db.engine import get_db_engine, db_session_scope
 from backend.db.models import Base, DatabaseVersion
 
@@ -162,13 +162,82 @@ class MigrationRunner:
             migration_003_up,
             migration_003_down
         ))
+        
+        # Migration 004: Add missing foreign key columns in place
+        def migration_004_up():
+            columns = [
+                ('accuracy_metrics', 'model_checkpoint_id', 'INTEGER REFERENCES neural_checkpoints(id)'),
+                ('neural_checkpoints', 'training_job_id', 'INTEGER REFERENCES training_jobs(id)'),
+                ('training_jobs', 'neural_config_id', 'INTEGER REFERENCES neural_configs(id)'),
+            ]
+            # ADD COLUMN keeps existing rows, unlike the old drop-and-recreate fix script
+            with self.engine.engine.begin() as conn:
+                inspector = inspect(conn)
+                tables = set(inspector.get_table_names())
+                for table, column, ddl in columns:
+                    if table not in tables:
+                        continue
+                    existing = {col['name'] for col in inspector.get_columns(table)}
+                    if column not in existing:
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                        logger.info(f"Added {table}.{column}")
+            self._set_version("004", "Add missing foreign key columns")
+        
+        self.migrations.append(Migration(
+            "004",
+            "Add missing foreign key columns",
+            migration_004_up
+        ))
+        
+        # Migration 005: Covering index for n-gram lookups
+        def migration_005_up():
+            with self.engine.engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_ngram_ctx_count
+                    ON markov_ngrams(n, context, count DESC, next_char, probability)
+                """))
+                # (n, context) is a prefix of both the new index and uq_markov_key
+                conn.execute(text("DROP INDEX IF EXISTS idx_markov_n_context"))
+                if 'sqlite' in str(self.engine.engine.url):
+                    conn.execute(text("ANALYZE markov_ngrams"))
+            self._set_version("005", "Add covering index for n-gram lookups")
+        
+        def migration_005_down():
+            with self.engine.engine.begin() as conn:
+                conn.execute(text("DROP INDEX IF EXISTS ix_ngram_ctx_count"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS idx_markov_n_context ON markov_ngrams(n, context)"))
+        
+        self.migrations.append(Migration(
+            "005",
+            "Add covering index for n-gram lookups",
+            migration_005_up,
+            migration_005_down
+        ))
+        
+        # Migration 006: Cumulative probability column for index-seek sampling
+        def migration_006_up():
+            with self.engine.engine.begin() as conn:
+                existing = {col['name'] for col in inspect(conn).get_columns('markov_ngrams')}
+                if 'cum_probability' not in existing:
+                    conn.execute(text("ALTER TABLE markov_ngrams ADD COLUMN cum_probability FLOAT"))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_ngram_cdf
+                    ON markov_ngrams(n, context, cum_probability)
+                """))
+            self._set_version("006", "Add n-gram cumulative probabilities")
+        
+        self.migrations.append(Migration(
+            "006",
+            "Add n-gram cumulative probabilities",
+            migration_006_up
+        ))
     
     def _get_current_version(self) -> str:
         """Get the current database version"""
         try:
             with db_session_scope() as session:
                 version = session.query(DatabaseVersion)\
-                    .order_by(DatabaseVersion.applied_at.desc())\
+                    .order_by(DatabaseVersion.version.desc())\
                     .first()
                 return version.version if version else "000"
         except Exception:
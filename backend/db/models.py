@@ -121,13 +121,16 @@ class MarkovNGram(Base):
     next_char = Column(String(1), nullable=False)
     count = Column(Integer, default=1)
     probability = Column(Float, nullable=True)
+    cum_probability = Column(Float, nullable=True)  # Running CDF within (n, context), by count desc
     
     # Unique constraint and indexes
     __table_args__ = (
         UniqueConstraint('n', 'context', 'next_char', name='uq_markov_key'),
         Index('idx_markov_n', 'n'),
         Index('idx_markov_context', 'context'),
-        Index('idx_markov_n_context', 'n', 'context'),
+        # Serves filter_by(n, context) ordered by count as a covering index scan
+        Index('ix_ngram_ctx_count', 'n', 'context', count.desc(), 'next_char', 'probability'),
+        Index('ix_ngram_cdf', 'n', 'context', 'cum_probability'),
     )
     
     def __repr__(self):
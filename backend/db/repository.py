@@ -130,6 +130,21 @@ class DatabaseRepository:
             )
             return cursor.lastrowid
     
+    def add_texts(self, texts: List[Dict[str, Any]]) -> List[int]:
+        """Add many texts to corpus in one transaction, returning their ids in input order"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            ids = []
+            for item in texts:
+                metadata = item.get('metadata')
+                cursor.execute(
+                    "INSERT INTO text_corpus (title, content, source, metadata) VALUES (?, ?, ?, ?)",
+                    (item.get('title'), item['content'], item.get('source'),
+                     json.dumps(metadata) if metadata else None)
+                )
+                ids.append(cursor.lastrowid)
+            return ids
+    
     def get_texts(self, limit: int = 100) -> List[Dict]:
         """Get texts from corpus"""
         with self.get_connection() as conn:
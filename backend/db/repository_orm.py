@@ -3,15 +3,18 @@ Enhanced Database Repository using SQLAlchemy ORM
 Repository pattern implementation with ORM models
 """
 import json
+import re
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Generator
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_, or_
+from sqlalchemy import desc, func, and_, or_, select, insert, update, delete, text, cast, Float, event
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import logging
 
 from backend.db.engine import get_db_engine, db_session_scope
+from backend.db.cache import cached, repository_cache
 from backend.db.models import (
     NeuralConfig, TrainingJob, MarkovNGram, NeuralCheckpoint,
     TextCorpus, GenerationHistory, AccuracyMetric, DatabaseVersion
@@ -19,21 +22,62 @@ from backend.db.models import (
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'\S+')
+
+
+def _count_words(content: str) -> int:
+    """Count whitespace-separated words without building a list of them"""
+    return sum(1 for _ in _WORD_RE.finditer(content))
+
 
 class DatabaseRepository:
     """Enhanced database repository using SQLAlchemy ORM"""
     
-    def __init__(self):
+    def __init__(self, session: Optional[Session] = None):
+        """
+        Args:
+            session: Optional session to run every operation in (e.g. one per
+                request); the owner of the session commits and closes it
+        """
         self.engine = get_db_engine()
+        self.cache = repository_cache
+        self._session = session
     
     def get_session(self) -> Session:
         """Get a new database session"""
         return self.engine.get_session()
     
+    @contextmanager
+    def _session_scope(self) -> Generator[Session, None, None]:
+        """Use the bound session if there is one, else a transactional scope per call"""
+        if self._session is not None:
+            yield self._session
+        else:
+            with db_session_scope() as session:
+                yield session
+    
+    def _invalidate_after_commit(self, tag: str):
+        """Drop cached reads for tag once the write is committed, so none can be re-cached from before it"""
+        if self._session is None:
+            # _session_scope has already committed
+            self.cache.invalidate_tag(tag)
+        else:
+            event.listen(self._session, 'after_commit', lambda session: self.cache.invalidate_tag(tag), once=True)
+    
+    def _uses_bound_session(self, *args, **kwargs) -> bool:
+        """cached() bypass: reads through a caller's session may see its uncommitted writes"""
+        return self._session is not None
+    
+    def _detached(self, session: Session, instance):
+        """Detach an instance read for the shared cache, so no later rollback or close can expire it"""
+        if instance is not None and self._session is None:
+            session.expunge(instance)
+        return instance
+    
     # Neural Config Operations
     def create_neural_config(self, name: str, config: Dict[str, Any]) -> NeuralConfig:
         """Create a new neural configuration"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             neural_config = NeuralConfig(
                 name=name,
                 config=config
@@ -41,41 +85,43 @@ class DatabaseRepository:
             session.add(neural_config)
             session.flush()
             session.refresh(neural_config)
-            return neural_config
+        self._invalidate_after_commit('neural_config')
+        return neural_config
     
     def get_neural_config(self, config_id: int) -> Optional[NeuralConfig]:
         """Get neural config by ID"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(NeuralConfig).filter_by(id=config_id).first()
     
+    @cached(ttl=60, key=lambda self, name: f"cfg:{name}", tag='neural_config', bypass=_uses_bound_session)
     def get_neural_config_by_name(self, name: str) -> Optional[NeuralConfig]:
-        """Get neural config by name"""
-        with db_session_scope() as session:
-            return session.query(NeuralConfig).filter_by(name=name).first()
+        """Get neural config by name (cached, detached)"""
+        with self._session_scope() as session:
+            return self._detached(session, session.query(NeuralConfig).filter_by(name=name).first())
     
     def list_neural_configs(self) -> List[NeuralConfig]:
         """List all neural configurations"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(NeuralConfig).order_by(desc(NeuralConfig.created_at)).all()
     
     def update_neural_config(self, config_id: int, config: Dict[str, Any]) -> Optional[NeuralConfig]:
         """Update neural configuration"""
-        with db_session_scope() as session:
-            neural_config = session.query(NeuralConfig).filter_by(id=config_id).first()
-            if neural_config:
-                neural_config.config = config
-                session.flush()
-                session.refresh(neural_config)
-            return neural_config
+        with self._session_scope() as session:
+            neural_config = self._update_returning(
+                session, NeuralConfig, NeuralConfig.id == config_id, {'config': config}
+            )
+        self._invalidate_after_commit('neural_config')
+        return neural_config
     
     def delete_neural_config(self, config_id: int) -> bool:
         """Delete neural configuration"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             neural_config = session.query(NeuralConfig).filter_by(id=config_id).first()
-            if neural_config:
-                session.delete(neural_config)
-                return True
-            return False
+            if not neural_config:
+                return False
+            session.delete(neural_config)
+        self._invalidate_after_commit('neural_config')
+        return True
     
     # Training Job Operations
     def create_training_job(
@@ -84,7 +130,7 @@ class DatabaseRepository:
         text_corpus_id: Optional[int] = None
     ) -> TrainingJob:
         """Create a new training job"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             job = TrainingJob(
                 job_id=str(uuid.uuid4()),
                 status='queued',
@@ -99,8 +145,10 @@ class DatabaseRepository:
     
     def get_training_job(self, job_id: str) -> Optional[TrainingJob]:
         """Get training job by job ID"""
-        with db_session_scope() as session:
-            return session.query(TrainingJob).filter_by(job_id=job_id).first()
+        with self._session_scope() as session:
+            return session.execute(
+                select(TrainingJob).where(TrainingJob.job_id == job_id)
+            ).scalars().first()
     
     def update_training_job(
         self,
@@ -111,30 +159,32 @@ class DatabaseRepository:
         error: Optional[str] = None
     ) -> Optional[TrainingJob]:
         """Update training job status"""
-        with db_session_scope() as session:
-            job = session.query(TrainingJob).filter_by(job_id=job_id).first()
-            if job:
-                if status:
-                    job.status = status
-                    if status == 'running' and not job.started_at:
-                        job.started_at = datetime.utcnow()
-                    elif status in ['success', 'error'] and not job.completed_at:
-                        job.completed_at = datetime.utcnow()
-                
-                if progress is not None:
-                    job.progress = progress
-                if message is not None:
-                    job.message = message
-                if error is not None:
-                    job.error = error
-                
-                session.flush()
-                session.refresh(job)
-            return job
+        values: Dict[str, Any] = {}
+        if status:
+            values['status'] = status
+            # Only stamp the transition the first time it happens
+            if status == 'running':
+                values['started_at'] = func.coalesce(TrainingJob.started_at, datetime.utcnow())
+            elif status in ['success', 'error']:
+                values['completed_at'] = func.coalesce(TrainingJob.completed_at, datetime.utcnow())
+        
+        if progress is not None:
+            values['progress'] = progress
+        if message is not None:
+            values['message'] = message
+        if error is not None:
+            values['error'] = error
+        
+        with self._session_scope() as session:
+            if not values:
+                return session.execute(
+                    select(TrainingJob).where(TrainingJob.job_id == job_id)
+                ).scalars().first()
+            return self._update_returning(session, TrainingJob, TrainingJob.job_id == job_id, values)
     
     def list_training_jobs(self, limit: int = 10) -> List[TrainingJob]:
         """List recent training jobs"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(TrainingJob)\
                 .order_by(desc(TrainingJob.created_at))\
                 .limit(limit)\
@@ -149,36 +199,76 @@ class DatabaseRepository:
         metadata: Optional[Dict[str, Any]] = None
     ) -> TextCorpus:
         """Add text to corpus"""
-        with db_session_scope() as session:
-            corpus = TextCorpus(
-                content=content,
-                title=title,
-                source=source,
-                meta_data=metadata,
-                word_count=len(content.split()),
-                char_count=len(content)
-            )
-            session.add(corpus)
-            session.flush()
-            session.refresh(corpus)
-            return corpus
+        return self.add_corpus_texts_bulk([{
+            'content': content,
+            'title': title,
+            'source': source,
+            'metadata': metadata
+        }])[0]
+    
+    def add_corpus_texts_bulk(self, texts: List[Dict[str, Any]]) -> List[TextCorpus]:
+        """
+        Add many texts to the corpus with one multi-row INSERT
+        
+        Args:
+            texts: Dicts with content and optional title, source and metadata
+        
+        Returns:
+            The new rows, in input order
+        """
+        if not texts:
+            return []
+        rows = [
+            {
+                'content': item['content'],
+                'title': item.get('title'),
+                'source': item.get('source'),
+                'meta_data': item.get('metadata'),
+                'word_count': _count_words(item['content']),
+                'char_count': len(item['content'])
+            }
+            for item in texts
+        ]
+        with self._session_scope() as session:
+            return list(session.scalars(
+                insert(TextCorpus).returning(TextCorpus, sort_by_parameter_order=True),
+                rows
+            ))
     
     def get_corpus_text(self, corpus_id: int) -> Optional[TextCorpus]:
         """Get corpus text by ID"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(TextCorpus).filter_by(id=corpus_id).first()
     
-    def list_corpus_texts(self, limit: int = 10) -> List[TextCorpus]:
-        """List corpus texts"""
-        with db_session_scope() as session:
-            return session.query(TextCorpus)\
-                .order_by(desc(TextCorpus.created_at))\
-                .limit(limit)\
-                .all()
+    def list_corpus_texts(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """List corpus text metadata, without content (use get_corpus_text for the body)"""
+        with self._session_scope() as session:
+            rows = session.query(
+                TextCorpus.id,
+                TextCorpus.title,
+                TextCorpus.source,
+                TextCorpus.meta_data,
+                TextCorpus.word_count,
+                TextCorpus.char_count,
+                TextCorpus.created_at
+            ).order_by(desc(TextCorpus.created_at)).limit(limit).all()
+            
+            return [
+                {
+                    'id': row.id,
+                    'title': row.title,
+                    'source': row.source,
+                    'metadata': row.meta_data,
+                    'word_count': row.word_count,
+                    'char_count': row.char_count,
+                    'created_at': row.created_at
+                }
+                for row in rows
+            ]
     
     def get_corpus_stats(self) -> Dict[str, Any]:
         """Get corpus statistics"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             total_texts = session.query(func.count(TextCorpus.id)).scalar()
             total_words = session.query(func.sum(TextCorpus.word_count)).scalar() or 0
             total_chars = session.query(func.sum(TextCorpus.char_count)).scalar() or 0
@@ -193,12 +283,14 @@ class DatabaseRepository:
     # Markov Model Operations
     def update_markov_ngram(self, n: int, context: str, next_char: str) -> MarkovNGram:
         """Update or create Markov n-gram"""
-        with db_session_scope() as session:
-            ngram = session.query(MarkovNGram).filter_by(
-                n=n,
-                context=context,
-                next_char=next_char
-            ).first()
+        with self._session_scope() as session:
+            ngram = session.execute(
+                select(MarkovNGram).where(
+                    MarkovNGram.n == n,
+                    MarkovNGram.context == context,
+                    MarkovNGram.next_char == next_char
+                )
+            ).scalars().first()
             
             if ngram:
                 ngram.count += 1
@@ -217,37 +309,70 @@ class DatabaseRepository:
     
     def get_markov_ngrams(self, n: int, context: str) -> List[MarkovNGram]:
         """Get Markov n-grams for given context"""
-        with db_session_scope() as session:
-            return session.query(MarkovNGram)\
-                .filter_by(n=n, context=context)\
-                .order_by(desc(MarkovNGram.count))\
-                .all()
+        with self._session_scope() as session:
+            return session.execute(
+                select(MarkovNGram)
+                .where(MarkovNGram.n == n, MarkovNGram.context == context)
+                .order_by(desc(MarkovNGram.count))
+            ).scalars().all()
     
     def calculate_markov_probabilities(self, n: int):
-        """Calculate probabilities for Markov n-grams"""
-        with db_session_scope() as session:
-            # Get all unique contexts for this n
-            contexts = session.query(MarkovNGram.context).filter_by(n=n).distinct().all()
-            
-            for (context,) in contexts:
-                # Get total count for this context
-                total_count = session.query(func.sum(MarkovNGram.count))\
-                    .filter_by(n=n, context=context)\
-                    .scalar()
-                
-                if total_count:
-                    # Update probabilities
-                    ngrams = session.query(MarkovNGram).filter_by(n=n, context=context).all()
-                    for ngram in ngrams:
-                        ngram.probability = ngram.count / total_count
+        """Calculate probabilities and the cumulative distribution for Markov n-grams"""
+        context_total = func.sum(MarkovNGram.count).over(partition_by=MarkovNGram.context)
+        running_total = func.sum(MarkovNGram.count).over(
+            partition_by=MarkovNGram.context,
+            order_by=(MarkovNGram.count.desc(), MarkovNGram.id),
+            rows=(None, 0)
+        )
+        dist = select(
+            MarkovNGram.id.label('id'),
+            (cast(MarkovNGram.count, Float) / context_total).label('probability'),
+            (cast(running_total, Float) / context_total).label('cum_probability')
+        ).where(MarkovNGram.n == n).subquery()
+        
+        with self._session_scope() as session:
+            session.execute(
+                update(MarkovNGram)
+                .where(MarkovNGram.id == dist.c.id)
+                .values(probability=dist.c.probability, cum_probability=dist.c.cum_probability),
+                execution_options={'synchronize_session': False}
+            )
+    
+    def sample_next_char(self, n: int, context: str, r: float) -> Optional[str]:
+        """
+        Sample the next character for a context with one index seek
+        
+        Args:
+            n: N-gram order
+            context: Preceding characters
+            r: Uniform random number in [0, 1)
+        
+        Returns:
+            The sampled character, or None if the context is unknown or
+            probabilities have not been calculated
+        """
+        with self._session_scope() as session:
+            return session.execute(
+                select(MarkovNGram.next_char)
+                .where(
+                    MarkovNGram.n == n,
+                    MarkovNGram.context == context,
+                    MarkovNGram.cum_probability >= r
+                )
+                .order_by(MarkovNGram.cum_probability)
+                .limit(1)
+            ).scalar()
     
     def clear_markov_model(self, n: Optional[int] = None):
         """Clear Markov model data"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             if n:
-                session.query(MarkovNGram).filter_by(n=n).delete()
+                session.execute(
+                    delete(MarkovNGram).where(MarkovNGram.n == n),
+                    execution_options={'synchronize_session': False}
+                )
             else:
-                session.query(MarkovNGram).delete()
+                self._wipe_table(session, MarkovNGram)
     
     # Neural Checkpoint Operations
     def create_checkpoint(
@@ -262,41 +387,78 @@ class DatabaseRepository:
         is_best: bool = False
     ) -> NeuralCheckpoint:
         """Create a neural model checkpoint"""
-        with db_session_scope() as session:
+        return self.create_checkpoints_bulk([{
+            'epochs': epochs,
+            'block_size': block_size,
+            'path': path,
+            'loss': loss,
+            'accuracy': accuracy,
+            'notes': notes,
+            'training_job_id': training_job_id,
+            'is_best': is_best
+        }])[0]
+    
+    def create_checkpoints_bulk(self, checkpoints: List[Dict[str, Any]]) -> List[NeuralCheckpoint]:
+        """
+        Create many neural model checkpoints with one multi-row INSERT
+        
+        Args:
+            checkpoints: Dicts of create_checkpoint arguments; if several are
+                marked is_best, only the last one keeps the flag
+        
+        Returns:
+            The new checkpoints, in input order
+        """
+        if not checkpoints:
+            return []
+        best_indexes = [i for i, item in enumerate(checkpoints) if item.get('is_best')]
+        best_index = best_indexes[-1] if best_indexes else None
+        rows = [
+            {
+                'epochs': item['epochs'],
+                'block_size': item['block_size'],
+                'path': item['path'],
+                'loss': item.get('loss'),
+                'accuracy': item.get('accuracy'),
+                'notes': item.get('notes'),
+                'training_job_id': item.get('training_job_id'),
+                'is_best': i == best_index
+            }
+            for i, item in enumerate(checkpoints)
+        ]
+        with self._session_scope() as session:
             # If marking as best, unmark previous best
-            if is_best:
-                session.query(NeuralCheckpoint).update({'is_best': False})
-            
-            checkpoint = NeuralCheckpoint(
-                epochs=epochs,
-                block_size=block_size,
-                path=path,
-                loss=loss,
-                accuracy=accuracy,
-                notes=notes,
-                training_job_id=training_job_id,
-                is_best=is_best
-            )
-            session.add(checkpoint)
-            session.flush()
-            session.refresh(checkpoint)
-            return checkpoint
-    
+            if best_index is not None:
+                session.execute(
+                    update(NeuralCheckpoint)
+                    .where(NeuralCheckpoint.is_best.is_(True))
+                    .values(is_best=False),
+                    execution_options={'synchronize_session': False}
+                )
+            created = list(session.scalars(
+                insert(NeuralCheckpoint).returning(NeuralCheckpoint, sort_by_parameter_order=True),
+                rows
+            ))
+        if best_index is not None:
+            self._invalidate_after_commit('checkpoint')
+        return created
+    
+    @cached(ttl=60, key=lambda self: "checkpoint:best", tag='checkpoint', bypass=_uses_bound_session)
     def get_best_checkpoint(self) -> Optional[NeuralCheckpoint]:
-        """Get the best checkpoint"""
-        with db_session_scope() as session:
-            return session.query(NeuralCheckpoint).filter_by(is_best=True).first()
+        """Get the best checkpoint (cached, detached)"""
+        with self._session_scope() as session:
+            return self._detached(session, session.query(NeuralCheckpoint).filter_by(is_best=True).first())
     
     def get_latest_checkpoint(self) -> Optional[NeuralCheckpoint]:
         """Get the latest checkpoint"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(NeuralCheckpoint)\
                 .order_by(desc(NeuralCheckpoint.created_at))\
                 .first()
     
     def list_checkpoints(self, limit: int = 10) -> List[NeuralCheckpoint]:
         """List recent checkpoints"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(NeuralCheckpoint)\
                 .order_by(desc(NeuralCheckpoint.created_at))\
                 .limit(limit)\
@@ -312,7 +474,7 @@ class DatabaseRepository:
         quality_score: Optional[float] = None
     ) -> GenerationHistory:
         """Record a text generation"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             generation = GenerationHistory(
                 prompt=prompt,
                 response=response,
@@ -327,7 +489,7 @@ class DatabaseRepository:
     
     def get_generation_history(self, limit: int = 10) -> List[GenerationHistory]:
         """Get generation history"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return session.query(GenerationHistory)\
                 .order_by(desc(GenerationHistory.created_at))\
                 .limit(limit)\
@@ -335,18 +497,15 @@ class DatabaseRepository:
     
     def clear_generation_history(self):
         """Clear all generation history"""
-        with db_session_scope() as session:
-            session.query(GenerationHistory).delete()
+        with self._session_scope() as session:
+            self._wipe_table(session, GenerationHistory)
     
     def update_generation_rating(self, generation_id: int, rating: int) -> Optional[GenerationHistory]:
         """Update user rating for a generation"""
-        with db_session_scope() as session:
-            generation = session.query(GenerationHistory).filter_by(id=generation_id).first()
-            if generation:
-                generation.user_rating = rating
-                session.flush()
-                session.refresh(generation)
-            return generation
+        with self._session_scope() as session:
+            return self._update_returning(
+                session, GenerationHistory, GenerationHistory.id == generation_id, {'user_rating': rating}
+            )
     
     # Accuracy Metrics Operations
     def record_accuracy(
@@ -357,17 +516,39 @@ class DatabaseRepository:
         checkpoint_id: Optional[int] = None
     ) -> AccuracyMetric:
         """Record an accuracy metric"""
-        with db_session_scope() as session:
-            metric = AccuracyMetric(
-                metric_type=metric_type,
-                value=value,
-                meta_data=metadata,
-                model_checkpoint_id=checkpoint_id
-            )
-            session.add(metric)
-            session.flush()
-            session.refresh(metric)
-            return metric
+        return self.record_accuracy_bulk([{
+            'metric_type': metric_type,
+            'value': value,
+            'metadata': metadata,
+            'checkpoint_id': checkpoint_id
+        }])[0]
+    
+    def record_accuracy_bulk(self, metrics: List[Dict[str, Any]]) -> List[AccuracyMetric]:
+        """
+        Record many accuracy metrics with one multi-row INSERT
+        
+        Args:
+            metrics: Dicts with metric_type, value and optional metadata and checkpoint_id
+        
+        Returns:
+            The new metrics, in input order
+        """
+        if not metrics:
+            return []
+        rows = [
+            {
+                'metric_type': item['metric_type'],
+                'value': item['value'],
+                'meta_data': item.get('metadata'),
+                'model_checkpoint_id': item.get('checkpoint_id')
+            }
+            for item in metrics
+        ]
+        with self._session_scope() as session:
+            return list(session.scalars(
+                insert(AccuracyMetric).returning(AccuracyMetric, sort_by_parameter_order=True),
+                rows
+            ))
     
     def get_accuracy_metrics(
         self,
@@ -376,7 +557,7 @@ class DatabaseRepository:
         limit: int = 100
     ) -> List[AccuracyMetric]:
         """Get accuracy metrics"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             query = session.query(AccuracyMetric)
             
             if metric_type:
@@ -388,7 +569,7 @@ class DatabaseRepository:
     
     def get_accuracy_summary(self) -> Dict[str, Any]:
         """Get summary of accuracy metrics"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             metrics = session.query(
                 AccuracyMetric.metric_type,
                 func.avg(AccuracyMetric.value).label('avg_value'),
@@ -408,27 +589,61 @@ class DatabaseRepository:
                 for m in metrics
             ]
     
+    # Helpers
+    def _wipe_table(self, session: Session, model):
+        """Delete every row of a table without loading rows into the session"""
+        table = model.__tablename__
+        dialect = session.get_bind().dialect.name
+        
+        if dialect == 'postgresql':
+            session.execute(text(f"TRUNCATE TABLE {table} RESTART IDENTITY"))
+            return
+        
+        # An unconditional DELETE lets SQLite drop the b-tree pages in one go
+        session.execute(delete(model), execution_options={'synchronize_session': False})
+        if dialect == 'sqlite':
+            # Reset AUTOINCREMENT as TRUNCATE would (sqlite_sequence only exists once used)
+            has_sequence = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'")
+            ).first()
+            if has_sequence:
+                session.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {'name': table})
+    
+    def _update_returning(self, session: Session, model, criteria, values: Dict[str, Any]):
+        """Apply a single UPDATE ... WHERE and return the updated row, if any"""
+        stmt = update(model).where(criteria).values(**values)
+        options = {'synchronize_session': False}
+        
+        if session.get_bind().dialect.update_returning:
+            # One round trip on PostgreSQL and SQLite 3.35+
+            return session.execute(stmt.returning(model), execution_options=options).scalars().first()
+        
+        session.execute(stmt, execution_options=options)
+        return session.execute(select(model).where(criteria)).scalars().first()
+    
     # Database Management
+    @cached(ttl=60, key=lambda self: "db:version", tag='database_version', bypass=_uses_bound_session)
     def get_database_version(self) -> Optional[str]:
         """Get current database version"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             version = session.query(DatabaseVersion)\
-                .order_by(desc(DatabaseVersion.applied_at))\
+                .order_by(desc(DatabaseVersion.version))\
                 .first()
             return version.version if version else None
     
     def set_database_version(self, version: str, description: Optional[str] = None):
         """Set database version"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             db_version = DatabaseVersion(
                 version=version,
                 description=description
             )
             session.add(db_version)
+        self._invalidate_after_commit('database_version')
     
     def get_table_stats(self) -> Dict[str, int]:
         """Get row counts for all tables"""
-        with db_session_scope() as session:
+        with self._session_scope() as session:
             return {
                 'neural_configs': session.query(func.count(NeuralConfig.id)).scalar(),
                 'training_jobs': session.query(func.count(TrainingJob.id)).scalar(),
@@ -443,14 +658,14 @@ class DatabaseRepository:
         """Vacuum database (SQLite specific)"""
         if 'sqlite' in str(self.engine.engine.url):
             with self.engine.engine.connect() as conn:
-                conn.execute("VACUUM")
+                conn.execute(text("VACUUM"))
                 logger.info("Database vacuumed")
     
     def analyze_database(self):
         """Analyze database for query optimization"""
         if 'sqlite' in str(self.engine.engine.url):
             with self.engine.engine.connect() as conn:
-                conn.execute("ANALYZE")
+                conn.execute(text("ANALYZE"))
                 logger.info("Database analyzed")
 
 
@@ -41,6 +41,11 @@ def init_all_tables():
     print(f"Creating tables in: {os.environ['DATABASE_PATH']}")
     Base.metadata.create_all(bind=engine.engine)
     
+    # Apply pending migrations (adds missing columns without dropping data)
+    from backend.db.migrations import run_migrations
+    status = run_migrations()
+    print(f"Schema version: {status['current_version']}")
+    
     # List created tables
     from sqlalchemy import inspect
     inspector = inspect(engine.engine)
@@ -5,6 +5,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 from api import routers
 from core.config import settings
@@ -20,19 +21,16 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     logger.info("Starting James LLM 1 Backend", version=settings.VERSION)
     
-    # Initialize database
-    await init_db()
-    
-    # Initialize ML models
+    # Initialize database and ML models concurrently - neither depends on the other
     from services.ml_service import MLService
-    ml_service = MLService()
-    await ml_service.initialize()
+    app.state.ml_service = MLService()
+    await asyncio.gather(init_db(), app.state.ml_service.initialize())
     
     yield
     
     # Cleanup
     logger.info("Shutting down James LLM 1 Backend")
-    await ml_service.cleanup()
+    await app.state.ml_service.cleanup()
 
 # Create FastAPI app
 app = FastAPI(
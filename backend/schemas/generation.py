@@ -1,7 +1,7 @@
 """
 Generation Schemas
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -14,8 +14,8 @@ class GenerateRequest(BaseModel):
     top_p: float = Field(0.9, ge=0, le=1, description="Top-p sampling parameter")
     model: Optional[str] = Field("default", description="Model to use for generation")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "prompt": "Once upon a time",
                 "temperature": 0.7,
@@ -24,6 +24,7 @@ class GenerateRequest(BaseModel):
                 "model": "default"
             }
         }
+    )
 
 
 class GenerateResponse(BaseModel):
@@ -52,12 +53,12 @@ class MonteCarloRequest(BaseModel):
     num_simulations: int = Field(..., ge=1, le=1000000)
     confidence_level: int = Field(..., ge=1, le=99)
     random_seed: int = Field(..., ge=0)
-    distribution_type: str = Field(..., regex="^(Normal|Uniform|Exponential)$")
+    distribution_type: str = Field(..., pattern="^(Normal|Uniform|Exponential)$")
     mean: float
     std_dev: float = Field(..., gt=0)
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "num_simulations": 10000,
                 "confidence_level": 95,
@@ -67,6 +68,7 @@ class MonteCarloRequest(BaseModel):
                 "std_dev": 1.0
             }
         }
+    )
 
 
 class MonteCarloResponse(BaseModel):
@@ -1,7 +1,7 @@
 """
 Model Management Schemas
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List
 
 
@@ -19,8 +19,10 @@ class ModelsList(BaseModel):
 
 class ModelDownloadRequest(BaseModel):
     """Model download request"""
+    model_config = ConfigDict(protected_namespaces=())
+    
     model_name: str = Field(..., min_length=1)
-    model_url: str = Field(..., regex="^https?://")
+    model_url: str = Field(..., pattern="^https?://")
 
 
 class ModelDownloadResponse(BaseModel):
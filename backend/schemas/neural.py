@@ -1,7 +1,7 @@
 """
 Neural Configuration Schemas
 """
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -17,15 +17,17 @@ class NeuralConfig(BaseModel):
     epochs: int = Field(..., ge=1, le=100, description="Number of epochs")
     dropout: float = Field(..., ge=0, le=0.9, description="Dropout rate")
     
-    @validator('hidden_size')
-    def validate_hidden_size_divisible_by_heads(cls, v, values):
+    @field_validator('hidden_size')
+    @classmethod
+    def validate_hidden_size_divisible_by_heads(cls, v: int, info: ValidationInfo) -> int:
         """Ensure hidden_size is divisible by num_heads for attention"""
-        if 'num_heads' in values and v % values['num_heads'] != 0:
+        if 'num_heads' in info.data and v % info.data['num_heads'] != 0:
             raise ValueError('hidden_size must be divisible by num_heads')
         return v
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        protected_namespaces=(),
+        json_schema_extra={
             "example": {
                 "model_type": "CharRNN",
                 "hidden_size": 256,
@@ -37,6 +39,7 @@ class NeuralConfig(BaseModel):
                 "dropout": 0.2
             }
         }
+    )
 
 
 class NeuralConfigResponse(BaseModel):
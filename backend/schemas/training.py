@@ -1,7 +1,7 @@
 """
 Training Schemas
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -12,14 +12,15 @@ class TrainRequest(BaseModel):
     block_size: int = Field(100000, ge=1000, le=1000000, description="Block size for processing")
     epochs: int = Field(5, ge=1, le=100, description="Number of training epochs")
     
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "text": "Your training text here...",
                 "block_size": 100000,
                 "epochs": 5
             }
         }
+    )
 
 
 class TrainResponse(BaseModel):
@@ -31,7 +32,7 @@ class TrainingProgress(BaseModel):
     """Training progress information"""
     progress: int = Field(..., ge=0, le=100)
     message: str
-    status: str = Field(..., regex="^(queued|running|success|error)$")
+    status: str = Field(..., pattern="^(queued|running|success|error)$")
     error: Optional[str] = None
 
 
@@ -75,7 +76,7 @@ class DataStats(BaseModel):
 
 class CorpusIngestRequest(BaseModel):
     """Corpus ingestion request"""
-    files: list[str] = Field(..., min_items=1)
+    files: list[str] = Field(..., min_length=1)
 
 
 class CorpusIngestResponse(BaseModel):
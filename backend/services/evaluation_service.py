@@ -2,20 +2,45 @@
 Monte Carlo evaluation service for automatic model quality assessment
 """
 import json
+import os
 import sqlite3
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import numpy as np
 
-from backend.services.generation_service import generate_text
+from backend.services.generation_service import generate_text_batch
+from backend.utils.word_validation import get_validator
 
 logger = logging.getLogger(__name__)
 
+# orjson is much faster for the histogram/parameter blobs; fall back to the stdlib
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 DATABASE_PATH = "james_llm.db"
 
+# Simulations generated per worker task, and worker processes per evaluation
+SIMULATION_CHUNK_SIZE = 25
+MAX_WORKERS = int(os.getenv('MC_WORKERS', os.cpu_count() or 1))
+
+_initialized = False
+
 def init_evaluation_table():
-    """Initialize evaluation results table if it doesn't exist"""
+    """Initialize evaluation results table if it doesn't exist (once per process)"""
+    global _initialized
+    if _initialized:
+        return
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
     
@@ -37,31 +62,78 @@ def init_evaluation_table():
     
     conn.commit()
     conn.close()
+    _initialized = True
 
-# Initialize table on module load
-init_evaluation_table()
-
-def validate_words(text: str) -> tuple[List[bool], float]:
+def validate_words(text: str) -> tuple[np.ndarray, float]:
     """
-    Validate words in generated text using PyEnchant
-    Returns (validation_mask, validity_percentage)
+    Validate words in generated text with the shared word validator
+    Returns (validation_mask, validity_percentage), the mask as a bool array
     """
-    # Import validation function from app.py
-    import sys
-    import os
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from app import _check_word
-    
     words = text.split()
-    valid_mask = [_check_word(w) for w in words]
+    # The validator memoizes its dictionary lookups, and generated text repeats words heavily
+    check = get_validator().check_word
+    valid_mask = np.fromiter(map(check, words), dtype=bool, count=len(words))
     
-    if len(valid_mask) > 0:
-        validity_percentage = (sum(valid_mask) / len(valid_mask)) * 100
-    else:
-        validity_percentage = 0.0
+    validity_percentage = float(valid_mask.mean() * 100) if valid_mask.size else 0.0
     
     return valid_mask, validity_percentage
 
+def _init_worker():
+    """Keep each worker's torch single-threaded; the pool provides the parallelism"""
+    import torch
+    torch.set_num_threads(1)
+
+def _chunk_rng(seed: int, chunk_index: int) -> np.random.Generator:
+    """Independent Philox stream for one chunk, so results don't depend on which worker ran it"""
+    return np.random.Generator(np.random.Philox(seed).jumped(chunk_index))
+
+def _simulate_chunk(num_samples: int, generation_params: Dict, seed: int, chunk_index: int) -> List[Dict]:
+    """Generate and validate a chunk of samples (runs in a worker process)"""
+    generated_texts = generate_text_batch(
+        batch_size=num_samples,
+        rng=_chunk_rng(seed, chunk_index),
+        **generation_params
+    )
+    
+    chunk_results = []
+    for generated_text in generated_texts:
+        valid_mask, validity_percentage = validate_words(generated_text)
+        chunk_results.append({
+            'text': generated_text,
+            'valid_mask': valid_mask,
+            'validity_percentage': validity_percentage,
+            'word_count': valid_mask.size
+        })
+    return chunk_results
+
+def _run_chunks(chunks: List[int], generation_params: Dict, seed: int) -> Iterator[List[Dict]]:
+    """Run simulation chunks across worker processes, yielding results as chunks finish"""
+    workers = min(MAX_WORKERS, len(chunks))
+    if workers <= 1:
+        # Not worth starting processes; use this process's cached models
+        for i, num_samples in enumerate(chunks):
+            try:
+                yield _simulate_chunk(num_samples, generation_params, seed, i)
+            except Exception as e:
+                logger.error(f"Error in simulation chunk {i + 1}: {e}")
+        return
+    
+    # spawn rather than fork: forking a process that has started torch threads can deadlock
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    ) as executor:
+        futures = {
+            executor.submit(_simulate_chunk, num_samples, generation_params, seed, i): i
+            for i, num_samples in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                logger.error(f"Error in simulation chunk {futures[future] + 1}: {e}")
+
 def run_monte_carlo_evaluation(
     num_simulations: int = 50,
     max_tokens: int = 100,
@@ -70,47 +142,41 @@ def run_monte_carlo_evaluation(
     bigram_weight: float = 0.2,
     trigram_weight: float = 0.3,
     tetragram_weight: float = 0.5,
-    training_job_id: Optional[str] = None
+    training_job_id: Optional[str] = None,
+    seed: Optional[int] = None
 ) -> Dict:
     """
     Run Monte Carlo simulation to evaluate model quality
+    
+    The same seed reproduces the same samples; one is drawn (and stored
+    with the parameters) when not given.
     """
     logger.info(f"Starting Monte Carlo evaluation with {num_simulations} simulations")
     
     results = []
     validity_percentages = []
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0])
     
-    for i in range(num_simulations):
-        try:
-            # Generate text
-            generated_text = generate_text(
-                n_chars=max_tokens,
-                prompt="",
-                bigram_weight=bigram_weight,
-                trigram_weight=trigram_weight,
-                tetragram_weight=tetragram_weight,
-                neural_weight=neural_weight,
-                temperature=temperature
-            )
-            
-            # Validate words
-            valid_mask, validity_percentage = validate_words(generated_text)
-            
-            results.append({
-                'text': generated_text,
-                'valid_mask': valid_mask,
-                'validity_percentage': validity_percentage,
-                'word_count': len(valid_mask)
-            })
-            
-            validity_percentages.append(validity_percentage)
-            
-            if (i + 1) % 10 == 0:
-                logger.info(f"Completed {i + 1}/{num_simulations} simulations")
-                
-        except Exception as e:
-            logger.error(f"Error in simulation {i + 1}: {e}")
-            continue
+    generation_params = {
+        'n_chars': max_tokens,
+        'prompt': "",
+        'bigram_weight': bigram_weight,
+        'trigram_weight': trigram_weight,
+        'tetragram_weight': tetragram_weight,
+        'neural_weight': neural_weight,
+        'temperature': temperature
+    }
+    chunks = [
+        min(SIMULATION_CHUNK_SIZE, num_simulations - start)
+        for start in range(0, num_simulations, SIMULATION_CHUNK_SIZE)
+    ]
+    
+    for chunk_results in _run_chunks(chunks, generation_params, seed):
+        for r in chunk_results:
+            results.append(r)
+            validity_percentages.append(r['validity_percentage'])
+        logger.info(f"Completed {len(results)}/{num_simulations} simulations")
     
     if not validity_percentages:
         logger.error("No successful simulations")
@@ -119,17 +185,15 @@ def run_monte_carlo_evaluation(
     # Calculate statistics
     validity_array = np.array(validity_percentages)
     
-    # Create histogram (4% bins for detail)
+    # Create histogram (4% bins for detail; 100% falls in the last bin)
     bin_size = 4
-    histogram = {}
-    for i in range(0, 100, bin_size):
-        bin_key = f"{i}-{i + bin_size}"
-        histogram[bin_key] = 0
-    
-    for percentage in validity_percentages:
-        bin_index = min(int(percentage // bin_size) * bin_size, 96)
-        bin_key = f"{bin_index}-{bin_index + bin_size}"
-        histogram[bin_key] = histogram.get(bin_key, 0) + 1
+    num_bins = 100 // bin_size
+    bins = np.clip((validity_array // bin_size).astype(np.int64), 0, num_bins - 1)
+    counts = np.bincount(bins, minlength=num_bins)
+    histogram = {
+        f"{i * bin_size}-{(i + 1) * bin_size}": int(counts[i])
+        for i in range(num_bins)
+    }
     
     evaluation_result = {
         'num_simulations': len(validity_percentages),
@@ -145,13 +209,14 @@ def run_monte_carlo_evaluation(
             'neural_weight': neural_weight,
             'bigram_weight': bigram_weight,
             'trigram_weight': trigram_weight,
-            'tetragram_weight': tetragram_weight
+            'tetragram_weight': tetragram_weight,
+            'seed': seed
         },
         'results': [  # Include individual sample results for frontend
             {
                 'valid_percentage': r['validity_percentage'],
                 'total_words': r['word_count'],
-                'valid_words': sum(r['valid_mask']),
+                'valid_words': int(r['valid_mask'].sum()),
                 'text': r['text'][:200]  # Truncate text to save space
             }
             for r in results[:100]  # Limit to first 100 samples
@@ -167,6 +232,8 @@ def run_monte_carlo_evaluation(
 
 def store_evaluation_result(result: Dict, training_job_id: Optional[str] = None):
     """Store evaluation result in database"""
+    # Training jobs may store results from a process that never ran app startup
+    init_evaluation_table()
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
     
@@ -188,8 +255,8 @@ def store_evaluation_result(result: Dict, training_job_id: Optional[str] = None)
         db_result['std_deviation'],
         db_result['min_validity'],
         db_result['max_validity'],
-        json.dumps(db_result['histogram']),
-        json.dumps(db_result['parameters'])
+        _json_dumps(db_result['histogram']),
+        _json_dumps(db_result['parameters'])
     ))
     
     evaluation_id = cursor.lastrowid
@@ -251,8 +318,8 @@ def get_evaluation_history(limit: int = 10) -> List[Dict]:
             'std_deviation': row[5],
             'min_validity': row[6],
             'max_validity': row[7],
-            'histogram': json.loads(row[8]),
-            'parameters': json.loads(row[9]),
+            'histogram': _json_loads(row[8]),
+            'parameters': _json_loads(row[9]),
             'created_at': row[10],
             'results': [  # Generate sample results for frontend display
                 {
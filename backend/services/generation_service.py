@@ -1,119 +1,252 @@
 """Text generation service combining Markov and neural models."""
-import random
-from collections import defaultdict
-from typing import Dict, List, Tuple, Optional
+import os
+import sqlite3
+import threading
+from threading import Lock
+from typing import Callable, Dict, List, Tuple, Optional
 
 import torch
 import numpy as np
-from sqlalchemy import text
 import logging
 logger = logging.getLogger(__name__)
 
-from backend.core.database import SessionLocal
-from backend.services.neural_service import HybridCharModel, VOCAB, CHAR2IDX, IDX2CHAR
-
-def load_markov_tables() -> Dict[int, Dict[str, Dict[str, float]]]:
-    """Load n-gram tables from DB as nested dicts."""
-    tables = {2: defaultdict(dict), 3: defaultdict(dict), 4: defaultdict(dict)}
-    
-    with SessionLocal() as session:
-        try:
-            rows = session.execute(text("SELECT n, context, next_char, count FROM markov_ngrams"))
-        except Exception as e:
-            logger.exception("Failed loading markov tables: %s", e)
-            return tables
-        for n, context, next_char, count in rows:
-            if n in tables:
-                tables[n][context][next_char] = count
-    
-    # Normalize to probabilities
-    for n in tables:
-        for context in tables[n]:
-            total = sum(tables[n][context].values())
-            if total > 0:
-                for char in tables[n][context]:
-                    tables[n][context][char] /= total
+from backend.core.database import DB_FILE
+from backend.services.neural_service import HybridCharModel, VOCAB, VOCAB_SIZE, CHAR2IDX, IDX2CHAR
+from backend.utils.char_codec import BITS_PER_CHAR, pack
+
+# Rows pulled per round trip when loading n-gram tables
+MARKOV_FETCH_ROWS = 10_000
+
+# Context window fed to the neural model
+NEURAL_SEQ_LEN = 11
+
+# Packed context keys hold the last 3 characters; an n-gram's context is the low n-1 of them
+MARKOV_KEY_MASK = (1 << (3 * BITS_PER_CHAR)) - 1
+_CONTEXT_MASKS = {n: (1 << ((n - 1) * BITS_PER_CHAR)) - 1 for n in (2, 3, 4)}
+
+# torch.compile the loaded neural model for inference (NEURAL_INFERENCE_COMPILE=1); eager by default
+NEURAL_INFERENCE_COMPILE = os.getenv('NEURAL_INFERENCE_COMPILE', '0') == '1'
+
+# Memory-map up to 256 MB of the database file for the table scan
+MARKOV_MMAP_SIZE = 268435456
+
+# Shared read-only connection for the loaders, opened on first use
+_READ_CONN: Optional[sqlite3.Connection] = None
+_READ_CONN_LOCK = Lock()
+
+# Loaded models shared across generate_text calls until training replaces them
+_CACHE: Dict[str, object] = {}
+_CACHE_LOCK = Lock()
+
+_thread_state = threading.local()
+
+def _rng() -> np.random.Generator:
+    """Per-thread generator, so concurrent generations don't share RNG state."""
+    rng = getattr(_thread_state, 'rng', None)
+    if rng is None:
+        rng = _thread_state.rng = np.random.default_rng()
+    return rng
+
+def load_markov_tables() -> Dict[int, Dict[int, np.ndarray]]:
+    """Load n-gram tables from DB as dense next-char probability arrays.
+    
+    tables[n][pack(context)] is a float32 array of length VOCAB_SIZE indexed by CHAR2IDX.
+    Rows are streamed in (n, context) order so each context is built and
+    normalized once, as soon as its last row has been read.
+    """
+    tables = {2: {}, 3: {}, 4: {}}
+    
+    try:
+        # Migration 005's ix_ngram_ctx_count covers this (n, context) ordered scan
+        cursor = _read_conn().execute("SELECT n, context, next_char, count FROM markov_ngrams ORDER BY n, context")
+        group = None
+        counts = None
+        while True:
+            rows = cursor.fetchmany(MARKOV_FETCH_ROWS)
+            if not rows:
+                break
+            for n, context, next_char, count in rows:
+                if (n, context) != group:
+                    _store_distribution(tables, group, counts)
+                    group = (n, context)
+                    counts = np.zeros(VOCAB_SIZE, dtype=np.float32)
+                idx = CHAR2IDX.get(next_char)
+                if idx is not None:
+                    counts[idx] = count
+        _store_distribution(tables, group, counts)
+        cursor.close()
+    except Exception as e:
+        logger.exception("Failed loading markov tables: %s", e)
     
     return tables
 
-def load_neural_model() -> Optional[HybridCharModel]:
-    """Load latest neural checkpoint."""
-    with SessionLocal() as session:
-        result = session.execute(text("SELECT path FROM neural_checkpoints ORDER BY created_at DESC LIMIT 1"))
-        row = result.first()
-        if not row:
-            return None
-        
-        model = HybridCharModel()
-        try:
-            model.load_state_dict(torch.load(row[0], map_location='cpu'))
-            model.eval()
-            return model
-        except:
-            return None
-
-def get_markov_probs(context: str, tables: Dict, weights: Dict[str, float]) -> Dict[str, float]:
+def _read_conn() -> sqlite3.Connection:
+    """Get the shared read-only connection, opening it on first use."""
+    global _READ_CONN
+    with _READ_CONN_LOCK:
+        if _READ_CONN is None:
+            conn = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = None
+            conn.execute(f"PRAGMA mmap_size={MARKOV_MMAP_SIZE}")
+            _READ_CONN = conn
+        return _READ_CONN
+
+def _store_distribution(tables: Dict[int, Dict[int, np.ndarray]], group, counts: Optional[np.ndarray]) -> None:
+    """Normalize one context's counts in place and add it to tables under its packed key."""
+    if group is None:
+        return
+    n, context = group
+    total = counts.sum()
+    if n not in tables or total <= 0 or len(context) != n - 1:
+        return
+    try:
+        key = pack(context)
+    except ValueError:
+        return
+    counts /= total
+    tables[n][key] = counts
+
+def load_neural_model() -> Optional[torch.nn.Module]:
+    """Load latest neural checkpoint, ready for inference."""
+    rows = _read_conn().execute(
+        "SELECT path FROM neural_checkpoints ORDER BY created_at DESC LIMIT 1"
+    ).fetchall()
+    if not rows:
+        return None
+    
+    try:
+        model = HybridCharModel.from_state_dict(torch.load(rows[0][0], map_location='cpu'))
+        model.eval()
+    except:
+        return None
+    return _compile_for_inference(model)
+
+def _compile_for_inference(model: HybridCharModel) -> torch.nn.Module:
+    """torch.compile the model when NEURAL_INFERENCE_COMPILE is set; eager otherwise or if compiling is unavailable."""
+    if not NEURAL_INFERENCE_COMPILE:
+        return model
+    try:
+        # Batch generation varies the batch size, so compile for dynamic shapes
+        return torch.compile(model, dynamic=True)
+    except Exception as e:
+        logger.warning("Could not compile neural model, running it eagerly: %s", e)
+        return model
+
+def get_markov_tables() -> Dict[int, Dict[int, np.ndarray]]:
+    """Get the Markov tables, loading them on first use."""
+    with _CACHE_LOCK:
+        if 'markov_tables' not in _CACHE:
+            _CACHE['markov_tables'] = load_markov_tables()
+        return _CACHE['markov_tables']
+
+def get_neural_model() -> Optional[torch.nn.Module]:
+    """Get the latest neural model, loading it on first use."""
+    with _CACHE_LOCK:
+        if 'neural_model' not in _CACHE:
+            _CACHE['neural_model'] = load_neural_model()
+        return _CACHE['neural_model']
+
+def invalidate_generation_cache() -> None:
+    """Drop the cached models so the next generation reloads them."""
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+def get_markov_probs(context: str, tables: Dict, weights: Dict[str, float]) -> np.ndarray:
     """Get blended Markov probabilities for context."""
-    probs = defaultdict(float)
+    return _blend_markov_probs(pack(context[-3:]), len(context), tables, weights)
+
+def _blend_markov_probs(key: int, length: int, tables: Dict, weights: Dict[str, float]) -> np.ndarray:
+    """get_markov_probs for a context given as the packed key of its last 3 characters and its length."""
+    probs = np.zeros(VOCAB_SIZE, dtype=np.float32)
     total_weight = 0
     
     for n in [4, 3, 2]:  # Try higher orders first
-        if n <= len(context) and weights.get(f"{n}gram", 0) > 0:
-            ctx = context[-(n-1):] if n > 1 else ""
-            if ctx in tables[n]:
+        if n <= length and weights.get(f"{n}gram", 0) > 0:
+            dist = tables[n].get(key & _CONTEXT_MASKS[n])
+            if dist is not None:
                 weight = weights[f"{n}gram"]
                 total_weight += weight
-                for char, prob in tables[n][ctx].items():
-                    probs[char] += weight * prob
+                probs += weight * dist
     
     if total_weight > 0:
-        for char in probs:
-            probs[char] /= total_weight
+        probs /= total_weight
     
-    return dict(probs)
+    return probs
 
-def get_neural_probs(context: str, model: HybridCharModel) -> Dict[str, float]:
-    """Get neural model probabilities."""
-    if model is None:
-        return {}
+def _memoized_markov_probs(tables: Dict, weights: Dict[str, float]) -> Callable[[int, int], np.ndarray]:
+    """_blend_markov_probs for fixed tables and weights, memoized on what it reads of the context.
     
-    # Pad/truncate to sequence length
-    seq_len = 11
-    indices = [CHAR2IDX.get(c, 0) for c in context[-seq_len:]]
-    while len(indices) < seq_len:
-        indices.insert(0, 0)  # Pad with space
+    Only the packed last 3 characters and whether the context is at least
+    2, 3 or 4 long affect the result, so that pair is the key.
+    """
+    memo: Dict[Tuple[int, int], np.ndarray] = {}
     
-    with torch.no_grad():
-        x = torch.tensor([indices], dtype=torch.long)
-        logits = model(x)[0]
+    def markov_probs(key: int, length: int) -> np.ndarray:
+        memo_key = (key, min(length, 4))
+        probs = memo.get(memo_key)
+        if probs is None:
+            probs = memo[memo_key] = _blend_markov_probs(key, length, tables, weights)
+        return probs
+    
+    return markov_probs
+
+def _new_context_window(indices: List[int]) -> torch.Tensor:
+    """Build the (1, NEURAL_SEQ_LEN) model input from the last indices, left-padded with 0."""
+    window = torch.zeros(1, NEURAL_SEQ_LEN, dtype=torch.long)
+    tail = indices[-NEURAL_SEQ_LEN:]
+    if tail:
+        window[0, NEURAL_SEQ_LEN - len(tail):] = torch.tensor(tail, dtype=torch.long)
+    return window
+
+def _push_context(window: torch.Tensor, idx: int) -> None:
+    """Shift the window left in place and append idx."""
+    window[0, :-1] = window[0, 1:].clone()
+    window[0, -1] = idx
+
+def get_neural_probs(window: torch.Tensor, model: Optional[torch.nn.Module]) -> Optional[np.ndarray]:
+    """Get neural model probabilities for a (1, NEURAL_SEQ_LEN) window of vocab indices."""
+    if model is None:
+        return None
+    
+    with torch.inference_mode():
+        logits = model(window)[0]
         probs = torch.softmax(logits, dim=0)
         
-    return {IDX2CHAR[i]: probs[i].item() for i in range(len(IDX2CHAR))}
+    return probs.numpy()
 
-def apply_temperature(probs: Dict[str, float], temperature: float) -> Dict[str, float]:
+def apply_temperature(probs: np.ndarray, temperature: float) -> np.ndarray:
     """Apply temperature scaling to probabilities."""
-    if temperature == 1.0 or not probs:
+    if temperature == 1.0:
         return probs
     
-    # Convert to log space, scale, convert back
-    chars = list(probs.keys())
-    values = np.array([probs[c] for c in chars])
-    values = np.clip(values, 1e-10, 1.0)  # Avoid log(0)
-    
-    log_probs = np.log(values) / temperature
-    exp_probs = np.exp(log_probs - np.max(log_probs))  # Numerical stability
-    exp_probs /= np.sum(exp_probs)
-    
-    return {chars[i]: exp_probs[i] for i in range(len(chars))}
+    # p ** (1/T), renormalized; equivalent to scaling log-probs by 1/T.
+    # Works row-wise on a (batch, VOCAB_SIZE) array too.
+    scaled = np.power(probs, 1.0 / temperature)
+    total = scaled.sum(axis=-1, keepdims=True)
+    return np.divide(scaled, total, out=scaled, where=total > 0)
 
-def sample_char(probs: Dict[str, float]) -> str:
+def sample_char(probs: np.ndarray, rng: Optional[np.random.Generator] = None) -> str:
     """Sample a character from probability distribution."""
-    if not probs:
+    cdf = np.cumsum(probs)
+    total = cdf[-1]
+    if total <= 0:
         return ' '
     
-    chars = list(probs.keys())
-    weights = list(probs.values())
-    return random.choices(chars, weights=weights)[0]
+    if rng is None:
+        rng = _rng()
+    idx = int(cdf.searchsorted(rng.random() * total, side='right'))
+    return IDX2CHAR[min(idx, VOCAB_SIZE - 1)]
+
+def _markov_weights(bigram_weight: float, trigram_weight: float, tetragram_weight: float) -> Dict[str, float]:
+    """Normalize Markov weights."""
+    total_markov = bigram_weight + trigram_weight + tetragram_weight
+    if total_markov > 0:
+        return {
+            "2gram": bigram_weight / total_markov,
+            "3gram": trigram_weight / total_markov,
+            "4gram": tetragram_weight / total_markov
+        }
+    return {"2gram": 0, "3gram": 0, "4gram": 0}
 
 def generate_text(
     n_chars: int,
@@ -122,51 +255,129 @@ def generate_text(
     trigram_weight: float = 0.3,
     tetragram_weight: float = 0.5,
     neural_weight: float = 0.8,
-    temperature: float = 1.0
+    temperature: float = 1.0,
+    markov_tables: Optional[Dict] = None,
+    neural_model: Optional[torch.nn.Module] = None,
+    rng: Optional[np.random.Generator] = None
 ) -> str:
-    """Generate text using hybrid Markov-neural model."""
+    """Generate text using hybrid Markov-neural model.
+    
+    markov_tables and neural_model default to the cached models; rng
+    defaults to this thread's generator.
+    """
     
     # Load models
-    markov_tables = load_markov_tables()
-    neural_model = load_neural_model()
+    if markov_tables is None:
+        markov_tables = get_markov_tables()
+    if neural_model is None:
+        neural_model = get_neural_model()
     
-    # Normalize Markov weights
-    total_markov = bigram_weight + trigram_weight + tetragram_weight
-    if total_markov > 0:
-        weights = {
-            "2gram": bigram_weight / total_markov,
-            "3gram": trigram_weight / total_markov,
-            "4gram": tetragram_weight / total_markov
-        }
-    else:
-        weights = {"2gram": 0, "3gram": 0, "4gram": 0}
+    weights = _markov_weights(bigram_weight, trigram_weight, tetragram_weight)
+    markov_probs_for = _memoized_markov_probs(markov_tables, weights)
+    # Skip a source entirely when it has no share of the blend
+    use_markov = neural_weight < 1.0 and any(w > 0 for w in weights.values())
+    use_neural = neural_model is not None and neural_weight > 0
     
     # Clean prompt
     clean_prompt = ''.join(c for c in prompt.upper() if c in CHAR2IDX)
     context = clean_prompt
+    markov_key = pack(clean_prompt[-3:])
+    # Neural input, reused and shifted in place every step
+    window = _new_context_window([CHAR2IDX[c] for c in clean_prompt])
     
     # Generate characters
+    if rng is None:
+        rng = _rng()
     for _ in range(n_chars):
-        # Get Markov probabilities
-        markov_probs = get_markov_probs(context, markov_tables, weights)
-        
-        # Get neural probabilities
-        neural_probs = get_neural_probs(context, neural_model)
-        
-        # Blend probabilities
-        final_probs = {}
-        all_chars = set(markov_probs.keys()) | set(neural_probs.keys())
-        
-        for char in all_chars:
-            m_prob = markov_probs.get(char, 0)
-            n_prob = neural_probs.get(char, 0)
-            final_probs[char] = (1 - neural_weight) * m_prob + neural_weight * n_prob
+        # Blend Markov and neural probabilities
+        final_probs = np.zeros(VOCAB_SIZE, dtype=np.float32)
+        if use_markov:
+            final_probs += (1 - neural_weight) * markov_probs_for(markov_key, len(context))
+        if use_neural:
+            final_probs += neural_weight * get_neural_probs(window, neural_model)
         
         # Apply temperature
         final_probs = apply_temperature(final_probs, temperature)
         
         # Sample next character
-        next_char = sample_char(final_probs)
+        next_char = sample_char(final_probs, rng)
+        next_idx = CHAR2IDX[next_char]
         context += next_char
+        markov_key = ((markov_key << BITS_PER_CHAR) | next_idx) & MARKOV_KEY_MASK
+        _push_context(window, next_idx)
     
     return context
+
+def generate_text_batch(
+    n_chars: int,
+    batch_size: int,
+    prompt: str = "",
+    bigram_weight: float = 0.2,
+    trigram_weight: float = 0.3,
+    tetragram_weight: float = 0.5,
+    neural_weight: float = 0.8,
+    temperature: float = 1.0,
+    markov_tables: Optional[Dict] = None,
+    neural_model: Optional[torch.nn.Module] = None,
+    rng: Optional[np.random.Generator] = None
+) -> List[str]:
+    """Generate batch_size independent texts in lock-step.
+    
+    Same sampling as generate_text, but each step runs the neural model once
+    on a (batch_size, NEURAL_SEQ_LEN) input instead of once per sequence.
+    Pass a seeded rng for reproducible output.
+    """
+    if markov_tables is None:
+        markov_tables = get_markov_tables()
+    if neural_model is None:
+        neural_model = get_neural_model()
+    
+    weights = _markov_weights(bigram_weight, trigram_weight, tetragram_weight)
+    markov_probs_for = _memoized_markov_probs(markov_tables, weights)
+    use_markov = neural_weight < 1.0 and any(w > 0 for w in weights.values())
+    use_neural = neural_model is not None and neural_weight > 0
+    
+    clean_prompt = ''.join(c for c in prompt.upper() if c in CHAR2IDX)
+    contexts = [clean_prompt] * batch_size
+    markov_keys = np.full(batch_size, pack(clean_prompt[-3:]), dtype=np.int64)
+    length = len(clean_prompt)
+    
+    # Left-padded index history shared by all sequences; column t holds step t
+    history = np.zeros((batch_size, NEURAL_SEQ_LEN + len(clean_prompt) + n_chars), dtype=np.int64)
+    pos = NEURAL_SEQ_LEN
+    for c in clean_prompt:
+        history[:, pos] = CHAR2IDX[c]
+        pos += 1
+    
+    space_idx = CHAR2IDX[' ']
+    if rng is None:
+        rng = _rng()
+    for _ in range(n_chars):
+        final_probs = np.zeros((batch_size, VOCAB_SIZE), dtype=np.float32)
+        
+        if use_markov:
+            markov_probs = np.stack([markov_probs_for(key, length) for key in markov_keys.tolist()])
+            final_probs += (1 - neural_weight) * markov_probs
+        
+        if use_neural:
+            with torch.inference_mode():
+                x = torch.from_numpy(history[:, pos - NEURAL_SEQ_LEN:pos])
+                neural_probs = torch.softmax(neural_model(x), dim=-1).numpy()
+            final_probs += neural_weight * neural_probs
+        
+        final_probs = apply_temperature(final_probs, temperature)
+        
+        # Inverse-CDF sampling for every row at once
+        cdf = np.cumsum(final_probs, axis=1)
+        totals = cdf[:, -1]
+        draws = rng.random(batch_size) * totals
+        next_idx = np.minimum((cdf <= draws[:, None]).sum(axis=1), VOCAB_SIZE - 1)
+        next_idx[totals <= 0] = space_idx
+        
+        history[:, pos] = next_idx
+        pos += 1
+        contexts = [ctx + IDX2CHAR[i] for ctx, i in zip(contexts, next_idx.tolist())]
+        markov_keys = ((markov_keys << BITS_PER_CHAR) | next_idx) & MARKOV_KEY_MASK
+        length += 1
+    
+    return contexts
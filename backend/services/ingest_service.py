@@ -0,0 +1,117 @@
+"""
+Corpus Ingest Service
+Writes corpus texts to the database in batches: concurrent submissions share one
+transaction, and each caller waits for its own row id
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from backend.db.repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+# Texts written per transaction
+BATCH_SIZE = 64
+# Pending texts held in memory before enqueueing is refused
+MAX_QUEUE_SIZE = 10_000
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+
+
+async def add_text(
+    content: str,
+    title: Optional[str] = None,
+    source: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Add a text to the corpus, batched with any other texts submitted meanwhile
+
+    Returns:
+        Id of the new corpus row
+
+    Raises:
+        RuntimeError: If the worker is not running
+        asyncio.QueueFull: If the backlog is full
+        Exception: Whatever the insert raised, if it failed
+    """
+    if _queue is None:
+        raise RuntimeError("Corpus ingest worker is not running")
+
+    written = asyncio.get_running_loop().create_future()
+    _queue.put_nowait({
+        'content': content,
+        'title': title,
+        'source': source,
+        'metadata': metadata,
+        'written': written
+    })
+    return await written
+
+
+def pending_count() -> int:
+    """Number of texts waiting to be written"""
+    return _queue.qsize() if _queue is not None else 0
+
+
+async def _drain_batch() -> List[Dict[str, Any]]:
+    """Wait for one text, then take whatever else is already queued up to BATCH_SIZE"""
+    batch = [await _queue.get()]
+    while len(batch) < BATCH_SIZE and not _queue.empty():
+        batch.append(_queue.get_nowait())
+    return batch
+
+
+async def _run_worker():
+    repo = get_repository()
+    while True:
+        batch = await _drain_batch()
+        try:
+            # The insert is blocking; keep it off the event loop
+            ids = await asyncio.to_thread(repo.add_texts, batch)
+            logger.info(f"Ingested {len(batch)} corpus texts")
+            for item, text_id in zip(batch, ids):
+                # A caller that disconnected has cancelled its future
+                if not item['written'].done():
+                    item['written'].set_result(text_id)
+        except Exception as e:
+            logger.exception(f"Failed to ingest {len(batch)} corpus texts")
+            for item in batch:
+                if not item['written'].done():
+                    item['written'].set_exception(e)
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def start_worker():
+    """Start the ingest worker on the running event loop"""
+    global _queue, _worker
+    if _worker is not None and not _worker.done():
+        return
+    _queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+    _worker = asyncio.create_task(_run_worker())
+
+
+async def stop_worker(timeout: float = 30.0):
+    """Flush queued texts, then stop the worker"""
+    global _queue, _worker
+    if _worker is None:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Stopping corpus ingest with {_queue.qsize()} texts still queued")
+    _worker.cancel()
+    try:
+        await _worker
+    except asyncio.CancelledError:
+        pass
+    while not _queue.empty():
+        item = _queue.get_nowait()
+        if not item['written'].done():
+            item['written'].set_exception(RuntimeError("Corpus ingest worker stopped"))
+    _queue = None
+    _worker = None
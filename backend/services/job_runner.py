@@ -1,65 +1,93 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
 from uuid import uuid4
-from typing import Dict
+from typing import Dict, Optional
 from threading import Lock
 
 from backend.services.training_service import train_with_persistence
+from backend.services.generation_service import invalidate_generation_cache
 
 logger = logging.getLogger(__name__)
 
-_executor = ThreadPoolExecutor(max_workers=2)
-_jobs: Dict[str, Dict] = {}
+# Training runs in its own process so it never competes with request handling
+# for the GIL. Both the pool and the manager holding job state start on first use.
+_executor: Optional[ProcessPoolExecutor] = None
+_manager = None
+_jobs = None
 _jobs_lock = Lock()
 
 
-def _run_job(job_id: str, text: str, block_size: int, epochs: int):
+def _ensure_started():
+    global _executor, _manager, _jobs
+    if _executor is None:
+        # spawn rather than fork: forking a process that has started torch threads can deadlock
+        ctx = multiprocessing.get_context("spawn")
+        _manager = ctx.Manager()
+        _jobs = _manager.dict()
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+
+
+def _run_job(jobs, job_id: str, text: str, block_size: int, epochs: int) -> bool:
+    """Train in the worker process, reporting progress through the shared jobs dict"""
     try:
         logger.info("job %s: starting persistent training", job_id)
-        _update(job_id, 0, "Initializing training...")
-        
+        _update(jobs, job_id, progress=0, message="Initializing training...")
+
         # Use the new persistent training service
         def progress_cb(pct: int, msg: str):
-            _update(job_id, pct, msg)
-        
+            _update(jobs, job_id, progress=pct, message=msg)
+
         checkpoint_path, stats = train_with_persistence(
             text=text,
             block_size=block_size,
             epochs=epochs,
             progress_callback=progress_cb
         )
-        
-        _update(job_id, 100, f"Completed - Checkpoint: {checkpoint_path}")
-        _set_status(job_id, "success")
+
+        _update(jobs, job_id, progress=100, message=f"Completed - Checkpoint: {checkpoint_path}", status="success")
         logger.info("job %s: completed with stats: %s", job_id, stats)
+        return True
     except Exception as e:
         logger.exception("job %s failed: %s", job_id, e)
-        _update(job_id, 100, f"Failed: {e}")
-        _set_status(job_id, "error", str(e))
+        _update(jobs, job_id, progress=100, message=f"Failed: {e}", status="error", error=str(e))
+        return False
 
 
-def _update(job_id: str, percent: int, message: str):
-    with _jobs_lock:
-        _jobs[job_id]["progress"] = percent
-        _jobs[job_id]["message"] = message
+def _update(jobs, job_id: str, **fields):
+    # Manager dicts only see assignments, so replace the whole entry
+    entry = dict(jobs[job_id])
+    entry.update(fields)
+    jobs[job_id] = entry
 
 
-def _set_status(job_id: str, status: str, error: str | None = None):
-    with _jobs_lock:
-        _jobs[job_id]["status"] = status
-        if error:
-            _jobs[job_id]["error"] = error
+def _on_done(job_id: str, future: Future):
+    """Runs in the API process once the worker finishes a job"""
+    try:
+        succeeded = future.result()
+    except Exception as e:
+        # The worker died or the job could not be sent to it
+        logger.exception("job %s failed: %s", job_id, e)
+        with _jobs_lock:
+            _update(_jobs, job_id, progress=100, message=f"Failed: {e}", status="error", error=str(e))
+        return
+    if succeeded:
+        # New n-grams and checkpoint: make generation reload them
+        invalidate_generation_cache()
 
 
 def launch_job(text: str, block_size: int, epochs: int) -> str:
     job_id = str(uuid4())
     with _jobs_lock:
+        _ensure_started()
         _jobs[job_id] = {"progress": 0, "message": "Queued", "status": "queued"}
-    _executor.submit(_run_job, job_id, text, block_size, epochs)
+        future = _executor.submit(_run_job, _jobs, job_id, text, block_size, epochs)
+    future.add_done_callback(lambda f: _on_done(job_id, f))
     return job_id
 
 
 def get_job(job_id: str):
     with _jobs_lock:
+        if _jobs is None:
+            return None
         return _jobs.get(job_id)
-
@@ -2,38 +2,49 @@
 
 Usage:
     from backend.services.markov_service import process_text_block
-    process_text_block(text, session)
+    process_text_block(text)
 """
-from collections import Counter, defaultdict
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, Iterator, Tuple
 
 import logging
-from sqlalchemy.dialects.sqlite import insert as sqlite_upsert
+import sqlite3
+import numpy as np
+from backend.core.database import DB_FILE
+from backend.utils import char_codec
 
-from backend.models.markov import MarkovNGram
-from backend.core.database import SessionLocal
+# Merge staged counts into the model in one statement
+MERGE_SQL = """
+    INSERT INTO markov_ngrams (n, context, next_char, count)
+    SELECT n, context, next_char, count FROM tmp_ng WHERE true
+    ON CONFLICT(n, context, next_char) DO UPDATE SET count = markov_ngrams.count + excluded.count
+"""
+
+
+def _clean_text(raw: str) -> np.ndarray:
+    """Upper-case and keep only A-Z and space, as vocabulary indices."""
+    return char_codec.encode(raw)
 
-ALLOWED_CHARS = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ ")
-# To avoid SQLite's ~999-parameter limit we chunk UPSERTs.
-UPSERT_CHUNK_ROWS = 200  # 200 rows * 4 params/row = 800 params < 999
 
+def _extract_ngrams(codes: np.ndarray, n_values: Iterable[int] = (2, 3, 4)) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Return dict of n → (packed n-gram keys, counts), one entry per distinct n-gram."""
+    return {n: np.unique(char_codec.pack_windows(codes, n), return_counts=True) for n in n_values}
 
-def _clean_text(raw: str) -> str:
-    """Upper-case and keep only A-Z and space."""
-    return "".join(ch for ch in raw.upper() if ch in ALLOWED_CHARS)
 
+def _ngram_rows(ngram_counts: Dict[int, Tuple[np.ndarray, np.ndarray]]) -> Iterator[Tuple[int, str, str, int]]:
+    """Yield (n, context, next_char, count) rows, unpacking each distinct n-gram once."""
+    for n, (keys, counts) in ngram_counts.items():
+        for gram, count in zip(char_codec.unpack(keys, n), counts.tolist()):
+            yield n, gram[:-1], gram[-1], count
 
-def _extract_ngrams(text: str, n_values: Iterable[int] = (2, 3, 4)) -> Dict[int, Counter]:
-    """Return dict of n → Counter({(context,next): count})."""
-    ngram_counts: Dict[int, Counter] = {n: Counter() for n in n_values}
-    for n in n_values:
-        if len(text) < n:
-            continue
-        for i in range(len(text) - n + 1):
-            chunk = text[i : i + n]
-            context, next_char = chunk[:-1], chunk[-1]
-            ngram_counts[n][(context, next_char)] += 1
-    return ngram_counts
+
+def _connect() -> sqlite3.Connection:
+    """Open a raw connection tuned for bulk writes; transactions are explicit."""
+    conn = sqlite3.connect(DB_FILE, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
 
 
 def process_text(raw_text: str, block_size: int = 100_000) -> None:
@@ -42,6 +53,7 @@ def process_text(raw_text: str, block_size: int = 100_000) -> None:
     text_len = len(raw_text)
     if text_len <= block_size:
         process_text_block(raw_text)
+        _analyze_ngrams()
         return
     start = 0
     block_idx = 0
@@ -52,6 +64,16 @@ def process_text(raw_text: str, block_size: int = 100_000) -> None:
         process_text_block(block)
         block_idx += 1
         start = end
+    _analyze_ngrams()
+
+
+def _analyze_ngrams() -> None:
+    """Refresh planner statistics so lookups pick the (n, context, count) index."""
+    conn = _connect()
+    try:
+        conn.execute("ANALYZE markov_ngrams")
+    finally:
+        conn.close()
 
 
 def process_text_block(raw_text: str) -> None:
@@ -64,31 +86,21 @@ def process_text_block(raw_text: str) -> None:
 
     logger.info(
         "Markov: cleaned_len=%d bigrams=%d trigrams=%d tetragrams=%d",
-        len(cleaned), len(ngram_counts.get(2, {})), len(ngram_counts.get(3, {})), len(ngram_counts.get(4, {})),
+        len(cleaned), len(ngram_counts[2][0]), len(ngram_counts[3][0]), len(ngram_counts[4][0]),
     )
 
-    with SessionLocal() as session:
-        for n, counter in ngram_counts.items():
-            if not counter:
-                continue
-            rows = [
-                {
-                    "n": n,
-                    "context": context,
-                    "next_char": next_char,
-                    "count": count,
-                }
-                for (context, next_char), count in counter.items()
-            ]
-            # Chunk UPSERTS to avoid SQLite variable limit (~999 params)
-            for i in range(0, len(rows), UPSERT_CHUNK_ROWS):
-                part = rows[i : i + UPSERT_CHUNK_ROWS]
-                stmt = sqlite_upsert(MarkovNGram).values(part)
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=[MarkovNGram.n, MarkovNGram.context, MarkovNGram.next_char],
-                    set_={"count": MarkovNGram.count + stmt.excluded.count},
-                )
-                session.execute(stmt)
-        session.commit()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_ng (n INT, context TEXT, next_char TEXT, count INT)")
+        conn.executemany("INSERT INTO tmp_ng VALUES (?, ?, ?, ?)", _ngram_rows(ngram_counts))
+        conn.execute(MERGE_SQL)
+        conn.execute("DROP TABLE tmp_ng")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
     logger.info("Markov: upsert complete")
 
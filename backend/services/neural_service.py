@@ -4,18 +4,27 @@ characters stored in markov_ngrams or any raw string.  The heavy lifting
 (CNN+BiLSTM+Attention) is included but size-reduced so it runs on CPU if
 no GPU is present.
 """
+import hashlib
+import os
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional, Callable
+from typing import Optional, Callable
 
 import logging
+import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+import torch.nn.functional as F
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler
 from sqlalchemy import text
 
 from backend.core.database import SessionLocal
 from backend.models.neural import NeuralCheckpoint
+from backend.utils.char_codec import encode
+from backend.utils.data_prefetcher import DataPrefetcher
+from backend.utils.training_runtime import (
+    AMP_DTYPES, compile_errors_suppressed, compile_for_training, select_device
+)
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -24,125 +33,247 @@ VOCAB = "ABCDEFGHIJKLMNOPQRSTUVWXYZ "
 CHAR2IDX = {c: i for i, c in enumerate(VOCAB)}
 IDX2CHAR = {i: c for c, i in CHAR2IDX.items()}
 VOCAB_SIZE = len(VOCAB)
+# Output width rounded up to a multiple of 8 so the last GEMM stays on tensor cores
+PADDED_VOCAB_SIZE = (VOCAB_SIZE + 7) // 8 * 8
 SEQ_LEN = 11  # context window
 
+# Allow TF32 matmuls on GPUs that support them
+torch.set_float32_matmul_precision("high")
+# Training shapes are fixed, so let cuDNN benchmark and keep the fastest kernels
+torch.backends.cudnn.benchmark = True
+
+# Background batch-loading processes per DataLoader (0 loads in the training process)
+DATALOADER_WORKERS = int(os.getenv('DATALOADER_WORKERS', min(os.cpu_count() or 1, 4)))
+
+# Sequence encoder for newly trained models: "lstm" or "transformer"
+NEURAL_ENCODER = os.getenv('NEURAL_ENCODER', 'lstm')
+
+# Tokenized corpus snapshots, reused until the rows they were built from change
+TOKEN_CACHE_DIR = Path(__file__).resolve().parent.parent / "cache" / "datasets"
+
+# The corpus rows a dataset is built from (id breaks created_at ties, so the order is stable)
+CORPUS_ROWS_SQL = "FROM text_corpus ORDER BY created_at DESC, id DESC LIMIT 100"
+
+def _corpus_signature(session) -> str:
+    """Digest of the query and the id, created_at and content length of each row it selects, in order.
+
+    SQLite reuses the newest id after a delete, so MAX(id) and COUNT(*) alone can
+    repeat for different rows.
+    """
+    digest = hashlib.blake2b(CORPUS_ROWS_SQL.encode(), digest_size=16)
+    for row in session.execute(text(f"SELECT id, created_at, length(content) {CORPUS_ROWS_SQL}")):
+        digest.update(repr(tuple(row)).encode())
+    return digest.hexdigest()
+
 # ---------------------------------------------------------------------------
 # Dataset pulling characters from DB (very naive sequential sampling)
 # ---------------------------------------------------------------------------
 class CharDBDataset(Dataset):
     def __init__(self):
-        self.buffer: List[int] = []
+        tokens = np.empty(0, dtype=np.uint8)
         logger = logging.getLogger(__name__)
         try:
             with SessionLocal() as s:
-                # Load from text_corpus table instead of markov_ngrams
-                res = s.execute(text("SELECT content FROM text_corpus ORDER BY created_at DESC LIMIT 100"))
-                for (content,) in res:
-                    # Clean text and convert to indices
-                    cleaned = ''.join(c for c in content.upper() if c in VOCAB)
-                    for ch in cleaned:
-                        if ch in CHAR2IDX:
-                            self.buffer.append(CHAR2IDX[ch])
+                cache_path = TOKEN_CACHE_DIR / f"corpus_{_corpus_signature(s)}.npy"
+                if cache_path.exists():
+                    tokens = np.load(cache_path, mmap_mode="r")
+                else:
+                    # Load from text_corpus table instead of markov_ngrams, streaming
+                    # rows so only the 1-byte-per-char tokens are held in full
+                    rows = s.execute(
+                        text(f"SELECT content {CORPUS_ROWS_SQL}")
+                        .execution_options(yield_per=16)
+                    ).scalars()
+                    buffer = bytearray()
+                    for content in rows:
+                        # Clean and convert to indices in one vectorized pass per row
+                        buffer += memoryview(encode(content))
+                    tokens = np.frombuffer(buffer, dtype=np.uint8)
+                    self._save_tokens(cache_path, tokens)
         except Exception as e:
             logger.exception("Failed reading text_corpus for dataset: %s", e)
         # Ensure enough length so training loop works
-        if len(self.buffer) < 10000:
+        if len(tokens) < 10000:
             # Fallback synthetic data from a simple pangram
             seed = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG " * 400
-            self.buffer.extend([CHAR2IDX.get(ch, 0) for ch in seed])
+            tokens = np.concatenate([tokens, encode(seed)])
+        # One contiguous tensor; samples are views into it
+        self.data = torch.from_numpy(tokens.astype(np.int64))
+        # (N, SEQ_LEN + 1) view: row i is sample i's context followed by its target
+        self.windows = self.data.unfold(0, SEQ_LEN + 1, 1)
+
+    @staticmethod
+    def _save_tokens(path: Path, tokens: np.ndarray):
+        """Write the token cache, replacing snapshots of older corpus states"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            for stale in path.parent.glob("corpus_*.npy"):
+                stale.unlink()
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, tokens)
+            tmp_path.replace(path)
+        except OSError as e:
+            logging.getLogger(__name__).warning("Could not cache tokenized corpus: %s", e)
 
     def __len__(self):
-        return len(self.buffer) - SEQ_LEN
+        return len(self.windows)
 
     def __getitem__(self, idx):
-        x = torch.tensor(self.buffer[idx : idx + SEQ_LEN], dtype=torch.long)
-        y = torch.tensor(self.buffer[idx + SEQ_LEN], dtype=torch.long)
-        return x, y
+        # idx may be a single index or a whole batch of them
+        w = self.windows[idx]
+        return w[..., :SEQ_LEN], w[..., SEQ_LEN]
 
 # ---------------------------------------------------------------------------
-# Model architecture (Embedding → 1 CNN → 1 BiLSTM → 2-head Attention → FF)
+# Model architecture (Embedding → 1 CNN → BiLSTM or Transformer → Attention → FF)
 # ---------------------------------------------------------------------------
 class HybridCharModel(nn.Module):
-    def __init__(self):
+    def __init__(self, encoder: str = "lstm"):
         super().__init__()
+        self.encoder_type = encoder
         self.embed = nn.Embedding(VOCAB_SIZE, 32)
         self.cnn = nn.Conv1d(32, 64, kernel_size=3, padding=1)
-        self.lstm = nn.LSTM(64, 256, num_layers=2, batch_first=True, bidirectional=True)
-        self.att_q = nn.Linear(512, 512)
-        self.att_k = nn.Linear(512, 512)
-        self.att_v = nn.Linear(512, 512)
+        if encoder == "lstm":
+            self.lstm = nn.LSTM(64, 256, num_layers=2, batch_first=True, bidirectional=True)
+        elif encoder == "transformer":
+            # Small pre-norm encoder; at SEQ_LEN tokens it is much cheaper than the BiLSTM
+            self.pos_embed = nn.Parameter(torch.zeros(1, SEQ_LEN, 64))
+            self.transformer = nn.TransformerEncoder(
+                nn.TransformerEncoderLayer(d_model=64, nhead=4, dim_feedforward=256, batch_first=True, norm_first=True),
+                num_layers=2,
+                enable_nested_tensor=False
+            )
+            self.encoder_proj = nn.Linear(64, 512)
+        else:
+            raise ValueError(f"Unknown encoder: {encoder}")
+        # Q, K and V projections packed into one GEMM
+        self.att_qkv = nn.Linear(512, 3 * 512)
         self.ff = nn.Sequential(
             nn.Linear(512, 512),
             nn.ReLU(),
             nn.Dropout(0.25),
             nn.Linear(512, 256),
             nn.ReLU(),
-            nn.Linear(256, VOCAB_SIZE),
+            nn.Linear(256, PADDED_VOCAB_SIZE),
         )
 
     def forward(self, x):
         x = self.embed(x)  # (B, L, 32)
         x = x.transpose(1, 2)  # (B, 32, L)
         x = self.cnn(x).transpose(1, 2)  # (B, L, 64)
-        out, _ = self.lstm(x)  # (B, L, 512)
-        # Simple 2-head attention (split dim)
-        q = self.att_q(out)
-        k = self.att_k(out)
-        v = self.att_v(out)
-        attn_scores = torch.softmax((q @ k.transpose(1, 2)) / (512 ** 0.5), dim=-1)
-        out = attn_scores @ v  # (B, L, 512)
+        if self.encoder_type == "transformer":
+            x = x + self.pos_embed[:, : x.size(1)]
+            out = self.encoder_proj(self.transformer(x))  # (B, L, 512)
+        else:
+            out, _ = self.lstm(x)  # (B, L, 512)
+        # Single-head attention over the full 512 dims, as one fused kernel
+        q, k, v = self.att_qkv(out).chunk(3, dim=-1)
+        out = F.scaled_dot_product_attention(q, k, v)  # (B, L, 512)
         # Use last timestep
         out = out[:, -1, :]
-        logits = self.ff(out)
+        # Drop the padding columns; they never reach the loss or sampling
+        logits = self.ff(out)[:, :VOCAB_SIZE]
         return logits
 
+    @classmethod
+    def from_state_dict(cls, state_dict: dict) -> "HybridCharModel":
+        """Build the model with the encoder a checkpoint was trained with, and load it"""
+        encoder = "transformer" if any(key.startswith("transformer.") for key in state_dict) else "lstm"
+        model = cls(encoder=encoder)
+        model.load_state_dict(state_dict)
+        return model
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints from before the fused projection have separate att_q/att_k/att_v
+        for param in ("weight", "bias"):
+            keys = [f"{prefix}att_{name}.{param}" for name in "qkv"]
+            if all(key in state_dict for key in keys):
+                state_dict[f"{prefix}att_qkv.{param}"] = torch.cat([state_dict.pop(key) for key in keys])
+            # ... and an unpadded VOCAB_SIZE-wide output layer
+            key = f"{prefix}ff.5.{param}"
+            value = state_dict.get(key)
+            if value is not None and value.shape[0] == VOCAB_SIZE:
+                padding = value.new_zeros((PADDED_VOCAB_SIZE - VOCAB_SIZE,) + value.shape[1:])
+                state_dict[key] = torch.cat([value, padding])
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
 # ---------------------------------------------------------------------------
 # Training helper
 # ---------------------------------------------------------------------------
 
+def _loader_options(device: torch.device) -> dict:
+    """DataLoader settings that overlap batch loading and host-to-device copies with training"""
+    options = {"pin_memory": device.type == "cuda"}
+    if DATALOADER_WORKERS > 0:
+        options.update(
+            num_workers=DATALOADER_WORKERS,
+            persistent_workers=True,
+            prefetch_factor=4
+        )
+    return options
+
 def train(block_size: int = 100_000, epochs: int = 5, batch_size: int = 32, progress_cb: Optional[Callable[[int, str], None]] = None):
     logger = logging.getLogger(__name__)
-    device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+    device = select_device()
     dataset = CharDBDataset()
-    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    # Each fetch gathers a whole shuffled batch of windows at once, skipping per-sample collation
+    sampler = BatchSampler(RandomSampler(dataset), batch_size=batch_size, drop_last=len(dataset) >= batch_size)
+    loader = DataLoader(dataset, sampler=sampler, batch_size=None, **_loader_options(device))
+    if device.type == "cuda":
+        loader = DataPrefetcher(loader, device)
 
     logger.info("Neural train: device=%s, dataset_len=%d, block_size=%d, epochs=%d", device, len(dataset), block_size, epochs)
 
-    model = HybridCharModel().to(device)
-    optim = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    model = HybridCharModel(encoder=NEURAL_ENCODER).to(device)
+    step_model = compile_for_training(model, device)
+    # Collected once; clipping walks this list every step
+    params = [p for p in model.parameters() if p.requires_grad]
+    # Fused AdamW updates all parameters in a single kernel on CUDA
+    optim = torch.optim.AdamW(params, lr=1e-3, fused=device.type == "cuda")
     criterion = nn.CrossEntropyLoss()
+    amp_dtype = AMP_DTYPES.get(device.type)
+    # Loss scaling is only needed for FP16
+    scaler = torch.amp.GradScaler(device.type, enabled=amp_dtype is torch.float16)
 
     total_steps_target = min(block_size, epochs * max(1, len(loader)))
     processed_steps = 0
 
     global_step = 0
-    for epoch in range(epochs):
-        epoch_loss = 0.0
-        for x, y in loader:
-            x, y = x.to(device), y.to(device)
-            optim.zero_grad()
-            logits = model(x)
-            loss = criterion(logits, y)
-            loss.backward()
-            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
-            optim.step()
-            epoch_loss += loss.item()
-            global_step += 1
-            processed_steps += 1
-            if progress_cb and total_steps_target:
-                pct = int(100 * processed_steps / total_steps_target)
-                progress_cb(min(pct, 99), f"epoch {epoch+1} step {processed_steps}")
+    with compile_errors_suppressed(step_model, model):
+        for epoch in range(epochs):
+            # Summed on the device; read back once per epoch instead of syncing every step
+            epoch_loss = torch.zeros((), device=device)
+            for x, y in loader:
+                x, y = x.to(device, non_blocking=True), y.to(device, non_blocking=True)
+                optim.zero_grad(set_to_none=True)
+                with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                    logits = step_model(x)
+                    loss = criterion(logits, y)
+                scaler.scale(loss).backward()
+                scaler.unscale_(optim)
+                torch.nn.utils.clip_grad_norm_(params, max_norm=1.0, foreach=True)
+                scaler.step(optim)
+                scaler.update()
+                epoch_loss += loss.detach()
+                global_step += 1
+                processed_steps += 1
+                if progress_cb and total_steps_target:
+                    pct = int(100 * processed_steps / total_steps_target)
+                    progress_cb(min(pct, 99), f"epoch {epoch+1} step {processed_steps}")
+                if global_step >= block_size:
+                    break
+            epoch_loss = epoch_loss.item()
+            logger.info("Epoch %d/%d loss=%.4f", epoch + 1, epochs, epoch_loss / max(1, len(loader)))
             if global_step >= block_size:
                 break
-        logger.info("Epoch %d/%d loss=%.4f", epoch + 1, epochs, epoch_loss / max(1, len(loader)))
-        if global_step >= block_size:
-            break
 
     # Save checkpoint
     ckpt_dir = Path(__file__).resolve().parent.parent / "cache" / "checkpoints"
     ckpt_dir.mkdir(parents=True, exist_ok=True)
     ckpt_path = ckpt_dir / f"model_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pt"
-    torch.save(model.state_dict(), ckpt_path)
+    # Copy to CPU up front rather than while pickling
+    cpu_state = {k: v.detach().cpu() for k, v in model.state_dict().items()}
+    torch.save(cpu_state, ckpt_path)
 
     with SessionLocal() as s:
         s.add(
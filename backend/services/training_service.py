@@ -2,17 +2,27 @@
 Enhanced Training Service
 Properly persists training data and accumulates across sessions
 """
+import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Callable, List, Tuple
+from typing import Optional, Callable, Dict, List, Tuple
+import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+import torch.nn.functional as F
+from torch.utils.data import Dataset
 
 from db.repository_orm import get_repository
 from services.markov_service import process_text_block
 from services.evaluation_service import run_monte_carlo_evaluation
+# The module evaluation_service generates with, so its model cache is the one cleared
+from backend.services.generation_service import invalidate_generation_cache
+from backend.utils.char_codec import encode
+from backend.utils.training_runtime import (
+    AMP_DTYPES, compile_errors_suppressed, compile_for_training, select_device
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +33,21 @@ IDX2CHAR = {i: c for c, i in CHAR2IDX.items()}
 VOCAB_SIZE = len(VOCAB)
 SEQ_LEN = 11  # context window
 
+# Allow TF32 matmuls and convolutions on GPUs that support them
+torch.set_float32_matmul_precision("high")
+torch.backends.cudnn.allow_tf32 = True
+# Training shapes are fixed, so let cuDNN benchmark and keep the fastest kernels
+torch.backends.cudnn.benchmark = True
+
+# Markov extraction writes SQLite while the model trains; one worker keeps the blocks' writes in order
+_MARKOV_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="markov-extract")
+
+# Post-training evaluations run here so training returns without waiting for them
+_EVAL_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="post-train-eval")
+
+# Batches between progress updates that read the loss back from the device
+LOSS_REPORT_INTERVAL = 50
+
 
 class BlockTextDataset(Dataset):
     """Dataset for training on a single text block"""
@@ -34,33 +59,27 @@ class BlockTextDataset(Dataset):
         Args:
             text_block: The text block to train on
         """
-        self.data = []
+        # Clean and convert text to indices in one lookup-table pass
+        indices = encode(text_block)
         
-        # Clean and convert text to indices
-        cleaned_text = self._clean_text(text_block)
-        for char in cleaned_text:
-            if char in CHAR2IDX:
-                self.data.append(CHAR2IDX[char])
-        
-        logger.info(f"Created dataset with {len(self.data)} characters")
+        logger.info(f"Created dataset with {len(indices)} characters")
         
         # If we don't have enough data for even one sample, pad with spaces
-        if len(self.data) < SEQ_LEN + 1:
-            logger.warning(f"Block too small ({len(self.data)} chars), padding with spaces")
-            while len(self.data) < SEQ_LEN + 1:
-                self.data.append(CHAR2IDX[' '])
-    
-    def _clean_text(self, text: str) -> str:
-        """Clean text to only include vocabulary characters"""
-        return ''.join(c for c in text.upper() if c in VOCAB)
+        if len(indices) < SEQ_LEN + 1:
+            logger.warning(f"Block too small ({len(indices)} chars), padding with spaces")
+            indices = np.pad(indices, (0, SEQ_LEN + 1 - len(indices)), constant_values=CHAR2IDX[' '])
+        
+        # One LongTensor for the whole block; samples are views into it
+        self.data = torch.from_numpy(indices.astype(np.int64))
+        # (N, SEQ_LEN + 1) view of every overlapping window, no copy
+        self.windows = self.data.unfold(0, SEQ_LEN + 1, 1)
     
     def __len__(self):
-        return max(0, len(self.data) - SEQ_LEN)
+        return self.windows.size(0)
     
     def __getitem__(self, idx):
-        x = torch.tensor(self.data[idx:idx + SEQ_LEN], dtype=torch.long)
-        y = torch.tensor(self.data[idx + SEQ_LEN], dtype=torch.long)
-        return x, y
+        w = self.windows[idx]
+        return w[..., :SEQ_LEN], w[..., SEQ_LEN]
 
 
 class ImprovedCharModel(nn.Module):
@@ -81,22 +100,19 @@ class ImprovedCharModel(nn.Module):
             nn.ReLU(),
         )
         
-        # Bidirectional LSTM for sequence modeling
+        # Bidirectional LSTM for sequence modeling; time-major, the layout its kernels run in
         self.lstm = nn.LSTM(
             128, hidden_dim, 
             num_layers=num_layers, 
-            batch_first=True, 
             bidirectional=True,
             dropout=0.2 if num_layers > 1 else 0
         )
         
-        # Attention mechanism
-        self.attention = nn.MultiheadAttention(
-            hidden_dim * 2,  # bidirectional
-            num_heads=4,
-            dropout=0.1,
-            batch_first=True
-        )
+        # Attention mechanism (bidirectional width); q, k and v come from one fused projection
+        self.num_heads = 4
+        self.attn_dropout = 0.1
+        self.attn_qkv = nn.Linear(hidden_dim * 2, hidden_dim * 6)
+        self.attn_out = nn.Linear(hidden_dim * 2, hidden_dim * 2)
         
         # Output layers
         self.output = nn.Sequential(
@@ -105,34 +121,66 @@ class ImprovedCharModel(nn.Module):
             nn.Dropout(0.3),
             nn.Linear(hidden_dim, vocab_size)
         )
+        
+        # Keep the LSTM weights in one contiguous buffer for cuDNN
+        self.lstm.flatten_parameters()
     
-    def forward(self, x):
+    def forward(self, x, y=None):
+        """Logits for next-character prediction; with targets y, also their mean cross-entropy loss"""
         # Embedding
         x = self.embed(x)  # (B, L, embed_dim)
         
         # CNN processing
         x = x.transpose(1, 2)  # (B, embed_dim, L)
         x = self.cnn(x)  # (B, 128, L)
-        x = x.transpose(1, 2)  # (B, L, 128)
+        # Straight to time-major: the only copy between the CNN and the LSTM
+        x = x.permute(2, 0, 1).contiguous()  # (L, B, 128)
         
         # LSTM processing
-        lstm_out, _ = self.lstm(x)  # (B, L, hidden_dim*2)
-        
-        # Self-attention
-        attn_out, _ = self.attention(lstm_out, lstm_out, lstm_out)
+        lstm_out, _ = self.lstm(x)  # (L, B, hidden_dim*2)
         
-        # Use last timestep for prediction
-        final_hidden = attn_out[:, -1, :]  # (B, hidden_dim*2)
+        # Self-attention, dispatched to a fused kernel where the device has one
+        L, B, D = lstm_out.shape
+        q, k, v = (
+            t.view(L, B, self.num_heads, D // self.num_heads).permute(1, 2, 0, 3)
+            for t in self.attn_qkv(lstm_out).chunk(3, dim=-1)
+        )  # (B, heads, L, head_dim)
+        # Only the last timestep is used for prediction, so only its query is attended
+        attn = F.scaled_dot_product_attention(
+            q[:, :, -1:], k, v, dropout_p=self.attn_dropout if self.training else 0.0
+        )  # (B, heads, 1, head_dim)
+        final_hidden = self.attn_out(attn.reshape(B, D))  # (B, hidden_dim*2)
         
         # Output
         logits = self.output(final_hidden)  # (B, vocab_size)
         
+        if y is not None:
+            # Computed here so a compiled forward fuses the loss with the output layer
+            return logits, F.cross_entropy(logits, y)
         return logits
+    
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints from before SDPA hold nn.MultiheadAttention weights, already packed q, k, v
+        renames = {
+            "attention.in_proj_weight": "attn_qkv.weight",
+            "attention.in_proj_bias": "attn_qkv.bias",
+            "attention.out_proj.weight": "attn_out.weight",
+            "attention.out_proj.bias": "attn_out.bias",
+        }
+        for old, new in renames.items():
+            if prefix + old in state_dict:
+                state_dict[prefix + new] = state_dict.pop(prefix + old)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
 
 
 # Removed persist_training_text - we don't want to accumulate text in database
 
 
+# The last trained model, keyed by (checkpoint path, mtime), so the training
+# worker can resume from it without reading the checkpoint back from disk
+_MODEL_CACHE: Dict[Tuple[str, float], ImprovedCharModel] = {}
+
+
 def train_with_persistence(
     text: str,
     block_size: int = 100_000,
@@ -158,30 +206,54 @@ def train_with_persistence(
     logger.info(f"Starting block-by-block training: {len(text)} chars, block_size={block_size}, epochs={epochs}")
     
     # Initialize device
-    device = torch.device("cuda" if torch.cuda.is_available() else 
-                         "mps" if torch.backends.mps.is_available() else "cpu")
+    device = select_device()
     logger.info(f"Using device: {device}")
+    if device.type == "cpu":
+        # More intra-op threads than this only oversubscribe for a model this small
+        torch.set_num_threads(min(8, os.cpu_count() or 1))
     
     # Initialize or load model
     if progress_callback:
         progress_callback(5, "Initializing neural model...")
     
-    model = ImprovedCharModel().to(device)
+    model = None
     repo = get_repository()
     
     # Try to load existing checkpoint to continue training
     best_checkpoint = repo.get_best_checkpoint()
     if best_checkpoint and Path(best_checkpoint.path).exists():
-        try:
-            logger.info(f"Loading existing checkpoint: {best_checkpoint.path}")
-            model.load_state_dict(torch.load(best_checkpoint.path, map_location=device))
-            logger.info("Continuing training from existing checkpoint")
-        except Exception as e:
-            logger.warning(f"Could not load checkpoint: {e}")
-    
-    # Initialize optimizer and criterion
-    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
-    criterion = nn.CrossEntropyLoss()
+        cache_key = (best_checkpoint.path, os.path.getmtime(best_checkpoint.path))
+        # Taken out while training, so a run that fails part-way can't leave half-trained weights behind
+        model = _MODEL_CACHE.pop(cache_key, None)
+        if model is not None:
+            logger.info(f"Continuing training from cached model for {best_checkpoint.path}")
+        else:
+            model = ImprovedCharModel().to(device)
+            try:
+                logger.info(f"Loading existing checkpoint: {best_checkpoint.path}")
+                state = torch.load(best_checkpoint.path, map_location=device, mmap=True, weights_only=True)
+                model.load_state_dict(state)
+                model.lstm.flatten_parameters()
+                logger.info("Continuing training from existing checkpoint")
+            except Exception as e:
+                logger.warning(f"Could not load checkpoint: {e}")
+    if model is None:
+        model = ImprovedCharModel().to(device)
+    
+    # Compiled wrapper used for the training steps
+    step_model = compile_for_training(model, device)
+    # On CUDA, reduce-overhead replays the compiled forward and backward as CUDA graphs
+    cuda_graphs = step_model is not model and device.type == "cuda"
+    
+    # Initialize optimizer (the loss comes from the model's forward)
+    # Collected once; clipping walks this list every step
+    params = [p for p in model.parameters() if p.requires_grad]
+    # Fused AdamW updates all parameters in a single kernel on CUDA
+    optimizer = torch.optim.AdamW(params, lr=learning_rate, fused=device.type == "cuda")
+    
+    # Mixed precision; loss scaling is only needed for FP16
+    amp_dtype = AMP_DTYPES.get(device.type)
+    scaler = torch.amp.GradScaler(device.type, enabled=amp_dtype is torch.float16)
     
     # Calculate number of blocks
     text_len = len(text)
@@ -192,6 +264,9 @@ def train_with_persistence(
     # Training statistics
     training_stats = {
         "epochs_per_block": epochs,
+        "block_size": block_size,
+        "batch_size": batch_size,
+        "learning_rate": learning_rate,
         "total_blocks": num_blocks,
         "total_steps": 0,
         "block_losses": [],
@@ -202,6 +277,7 @@ def train_with_persistence(
     
     # Process each block sequentially
     processed = 0
+    markov_future = None
     for block_idx in range(num_blocks):
         # Extract current block
         block_start = block_idx * block_size
@@ -214,9 +290,11 @@ def train_with_persistence(
             base_progress = int(90 * block_idx / num_blocks)
             progress_callback(base_progress, f"Processing block {block_idx + 1}/{num_blocks}...")
         
-        # Step 1: Extract Markov chains from this block
+        # Step 1: Extract Markov chains from this block, in the background while it trains
+        if markov_future is not None:
+            markov_future.result()  # at most one block in flight; re-raises its failure
         logger.info(f"Extracting Markov chains from block {block_idx + 1}")
-        process_text_block(text_block)
+        markov_future = _MARKOV_POOL.submit(process_text_block, text_block)
         
         # Step 2: Create dataset for this block
         block_dataset = BlockTextDataset(text_block)
@@ -225,47 +303,63 @@ def train_with_persistence(
             logger.warning(f"Block {block_idx + 1} has no valid training samples, skipping")
             continue
         
-        block_dataloader = DataLoader(block_dataset, batch_size=batch_size, shuffle=True)
+        # The block goes to the device once and is unfolded there, like block_dataset.windows
+        windows = block_dataset.data.to(device, non_blocking=True).unfold(0, SEQ_LEN + 1, 1)
+        # Drop the trailing partial batch so every step has the same shape
+        num_samples = len(windows)
+        if num_samples >= batch_size:
+            num_samples -= num_samples % batch_size
+        num_batches = (num_samples + batch_size - 1) // batch_size
         
         # Step 3: Train neural network on this block for specified epochs
         model.train()
         block_total_loss = 0
         block_step_count = 0
         
-        for epoch in range(epochs):
-            epoch_loss = 0
-            batch_count = 0
+        with compile_errors_suppressed(step_model, model):
+            for epoch in range(epochs):
+                # Summed on the device; read back once per epoch instead of syncing every step
+                epoch_loss = torch.zeros((), device=device)
+                batch_count = 0
             
-            for batch_idx, (x, y) in enumerate(block_dataloader):
-                x, y = x.to(device), y.to(device)
+                # One shuffle per epoch, generated on the device; batches are gathered from the windows
+                perm = torch.randperm(len(windows), device=device)[:num_samples]
+                for batch_idx, batch_indices in enumerate(perm.split(batch_size)):
+                    batch = windows.index_select(0, batch_indices)
+                    x, y = batch[:, :SEQ_LEN], batch[:, SEQ_LEN]
                 
-                optimizer.zero_grad()
-                logits = model(x)
-                loss = criterion(logits, y)
-                loss.backward()
+                    if cuda_graphs:
+                        # Each batch is a new iteration, so the graphs may reuse the previous one's memory
+                        torch.compiler.cudagraph_mark_step_begin()
+                    optimizer.zero_grad(set_to_none=True)
+                    with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                        logits, loss = step_model(x, y)
+                    scaler.scale(loss).backward()
                 
-                # Gradient clipping
-                torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+                    # Gradient clipping (on unscaled gradients)
+                    scaler.unscale_(optimizer)
+                    torch.nn.utils.clip_grad_norm_(params, max_norm=1.0, foreach=True)
                 
-                optimizer.step()
+                    scaler.step(optimizer)
+                    scaler.update()
                 
-                epoch_loss += loss.item()
-                batch_count += 1
-                block_step_count += 1
-                training_stats["total_steps"] += 1
+                    epoch_loss += loss.detach()
+                    batch_count += 1
+                    block_step_count += 1
+                    training_stats["total_steps"] += 1
                 
-                # Progress update
-                if progress_callback and batch_count % 10 == 0:
-                    block_progress = base_progress + int(90 * (block_idx + (epoch + 1) / epochs) / num_blocks)
-                    progress_callback(
-                        min(block_progress, 90),
-                        f"Block {block_idx+1}/{num_blocks}, Epoch {epoch+1}/{epochs}, Batch {batch_idx+1}/{len(block_dataloader)}, Loss: {loss.item():.4f}"
-                    )
+                    # Progress update
+                    if progress_callback and batch_count % LOSS_REPORT_INTERVAL == 0:
+                        block_progress = base_progress + int(90 * (block_idx + (epoch + 1) / epochs) / num_blocks)
+                        progress_callback(
+                            min(block_progress, 90),
+                            f"Block {block_idx+1}/{num_blocks}, Epoch {epoch+1}/{epochs}, Batch {batch_idx+1}/{num_batches}, Loss: {loss.item():.4f}"
+                        )
             
-            if batch_count > 0:
-                avg_epoch_loss = epoch_loss / batch_count
-                block_total_loss += avg_epoch_loss
-                logger.info(f"Block {block_idx+1}, Epoch {epoch+1}/{epochs} - Avg Loss: {avg_epoch_loss:.4f}")
+                if batch_count > 0:
+                    avg_epoch_loss = epoch_loss.item() / batch_count
+                    block_total_loss += avg_epoch_loss
+                    logger.info(f"Block {block_idx+1}, Epoch {epoch+1}/{epochs} - Avg Loss: {avg_epoch_loss:.4f}")
         
         # Record block statistics
         if block_step_count > 0:
@@ -275,6 +369,10 @@ def train_with_persistence(
         
         processed = block_end
     
+    # The checkpoint and its evaluation should see every block's n-grams
+    if markov_future is not None:
+        markov_future.result()
+    
     # Calculate final statistics
     if training_stats["block_losses"]:
         training_stats["final_loss"] = sum(training_stats["block_losses"]) / len(training_stats["block_losses"])
@@ -289,7 +387,13 @@ def train_with_persistence(
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     checkpoint_path = checkpoint_dir / f"model_{timestamp}.pt"
     
-    torch.save(model.state_dict(), checkpoint_path)
+    # Copy to CPU up front rather than while pickling
+    cpu_state = {k: v.detach().cpu() for k, v in model.state_dict().items()}
+    torch.save(cpu_state, checkpoint_path)
+    
+    # The model in memory is exactly this checkpoint; keep it for the next run
+    _MODEL_CACHE.clear()
+    _MODEL_CACHE[(str(checkpoint_path), os.path.getmtime(checkpoint_path))] = model
     
     # Save checkpoint record to database
     checkpoint = repo.create_checkpoint(
@@ -315,11 +419,27 @@ def train_with_persistence(
         checkpoint_id=checkpoint.id
     )
     
-    # Step 8: Run Monte Carlo evaluation after training completes
+    # Step 8: Queue the Monte Carlo evaluation; its result is stored under this checkpoint's id
     if progress_callback:
-        progress_callback(99, "Running Monte Carlo evaluation...")
+        progress_callback(99, "Queueing Monte Carlo evaluation...")
     
+    _EVAL_POOL.submit(_evaluate_checkpoint, checkpoint.id)
+    training_stats["monte_carlo_evaluation"] = {
+        "status": "queued",
+        "training_job_id": str(checkpoint.id)
+    }
+    
+    if progress_callback:
+        progress_callback(100, "Training complete!")
+    
+    return str(checkpoint_path), training_stats
+
+
+def _evaluate_checkpoint(checkpoint_id: int) -> Optional[dict]:
+    """Run the post-training Monte Carlo evaluation (on the evaluation pool)"""
     try:
+        # Evaluate the new checkpoint and n-grams, not models cached by an earlier run
+        invalidate_generation_cache()
         evaluation_result = run_monte_carlo_evaluation(
             num_simulations=100,  # Run 100 samples for post-training evaluation
             max_tokens=200,
@@ -328,23 +448,16 @@ def train_with_persistence(
             bigram_weight=0.2,
             trigram_weight=0.3,
             tetragram_weight=0.5,
-            training_job_id=str(checkpoint.id)
+            training_job_id=str(checkpoint_id)
         )
         
         if evaluation_result:
             logger.info(f"Monte Carlo evaluation complete: {evaluation_result['mean_validity']:.1f}% mean validity")
-            training_stats["monte_carlo_evaluation"] = {
-                "mean_validity": evaluation_result["mean_validity"],
-                "std_deviation": evaluation_result["std_deviation"]
-            }
+        return evaluation_result
     except Exception as e:
-        logger.error(f"Failed to run Monte Carlo evaluation: {e}")
         # Don't fail the training if evaluation fails
-    
-    if progress_callback:
-        progress_callback(100, "Training complete!")
-    
-    return str(checkpoint_path), training_stats
+        logger.error(f"Failed to run Monte Carlo evaluation: {e}")
+        return None
 
 
 def get_training_statistics() -> dict:
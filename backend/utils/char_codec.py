@@ -0,0 +1,77 @@
+"""
+Character Codec Utilities
+Vectorized mapping between text and vocabulary indices, and packing of short
+n-grams into integer keys
+"""
+from typing import List
+
+import numpy as np
+
+
+VOCAB = "ABCDEFGHIJKLMNOPQRSTUVWXYZ "
+
+# Each vocabulary index fits in 5 bits, so up to 6 characters pack into a uint32
+BITS_PER_CHAR = 5
+MAX_PACKED_CHARS = 6
+
+_CHAR_MASK = (1 << BITS_PER_CHAR) - 1
+_INVALID = 255
+
+# Byte value -> vocabulary index (255 for bytes outside the vocabulary)
+_LUT = np.full(256, _INVALID, dtype=np.uint8)
+for _i, _c in enumerate(VOCAB):
+    _LUT[ord(_c)] = _i
+
+# Vocabulary index -> ASCII byte
+_VOCAB_BYTES = np.frombuffer(VOCAB.encode("ascii"), dtype=np.uint8)
+
+
+def encode(raw: str) -> np.ndarray:
+    """Upper-case text and return the vocabulary indices of its A-Z and space characters"""
+    data = np.frombuffer(raw.upper().encode("ascii", "ignore"), dtype=np.uint8)
+    codes = _LUT[data]
+    return codes[codes != _INVALID]
+
+
+def decode(codes: np.ndarray) -> str:
+    """Turn vocabulary indices back into text"""
+    return _VOCAB_BYTES[codes].tobytes().decode("ascii")
+
+
+def pack_windows(codes: np.ndarray, n: int) -> np.ndarray:
+    """Pack every length-n window of codes into a uint32 key, first character in the high bits"""
+    if not 1 <= n <= MAX_PACKED_CHARS:
+        raise ValueError(f"Can only pack 1 to {MAX_PACKED_CHARS} characters, got {n}")
+
+    count = len(codes) - n + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint32)
+
+    keys = np.zeros(count, dtype=np.uint32)
+    for i in range(n):
+        keys <<= BITS_PER_CHAR
+        keys |= codes[i:i + count]
+    return keys
+
+
+def pack(text: str) -> int:
+    """Pack a short string of vocabulary characters into an integer key, as pack_windows does"""
+    if len(text) > MAX_PACKED_CHARS:
+        raise ValueError(f"Can only pack 1 to {MAX_PACKED_CHARS} characters, got {len(text)}")
+    key = 0
+    for c in text:
+        code = _LUT[ord(c)] if ord(c) < 256 else _INVALID
+        if code == _INVALID:
+            raise ValueError(f"Character {c!r} is not in the vocabulary")
+        key = (key << BITS_PER_CHAR) | int(code)
+    return key
+
+
+def unpack(keys: np.ndarray, n: int) -> List[str]:
+    """Turn packed length-n keys back into strings"""
+    if len(keys) == 0:
+        return []
+    shifts = BITS_PER_CHAR * np.arange(n - 1, -1, -1, dtype=np.uint32)
+    digits = (np.asarray(keys, dtype=np.uint32)[:, None] >> shifts) & _CHAR_MASK
+    chars = np.ascontiguousarray(_VOCAB_BYTES[digits])
+    return [b.decode("ascii") for b in chars.view(f"S{n}").ravel()]
@@ -0,0 +1,44 @@
+"""
+CUDA Data Prefetcher
+Copies the next batch to the GPU on a side stream while the current batch trains
+"""
+from typing import Iterator, Optional, Tuple
+
+import torch
+from torch.utils.data import DataLoader
+
+
+Batch = Tuple[torch.Tensor, torch.Tensor]
+
+
+class DataPrefetcher:
+    """Wraps an (x, y) DataLoader; iterating it yields batches already on the device"""
+
+    def __init__(self, loader: DataLoader, device: torch.device):
+        self.loader = loader
+        self.device = device
+
+    def __len__(self) -> int:
+        return len(self.loader)
+
+    def __iter__(self) -> Iterator[Batch]:
+        stream = torch.cuda.Stream(device=self.device)
+        batches = iter(self.loader)
+        next_batch = self._preload(batches, stream)
+        while next_batch is not None:
+            current = torch.cuda.current_stream(self.device)
+            current.wait_stream(stream)
+            x, y = next_batch
+            # The copies were made on the side stream; keep their memory alive for this one
+            x.record_stream(current)
+            y.record_stream(current)
+            next_batch = self._preload(batches, stream)
+            yield x, y
+
+    def _preload(self, batches: Iterator[Batch], stream: torch.cuda.Stream) -> Optional[Batch]:
+        try:
+            x, y = next(batches)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(stream):
+            return x.to(self.device, non_blocking=True), y.to(self.device, non_blocking=True)
@@ -0,0 +1,50 @@
+"""
+Training Runtime
+Device, mixed-precision and torch.compile choices shared by the training services
+"""
+import logging
+import os
+from contextlib import nullcontext
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+
+# Autocast dtype per device type; other devices train in FP32
+AMP_DTYPES = {"cuda": torch.float16, "mps": torch.float16, "cpu": torch.bfloat16}
+
+# Compile the training forward pass: on CUDA by default, on CPU too with
+# TORCH_COMPILE=1 (compiling rarely pays off there), never with TORCH_COMPILE=0
+TORCH_COMPILE = os.getenv('TORCH_COMPILE', 'cuda')
+
+
+def select_device() -> torch.device:
+    """Best available training device: CUDA, then MPS, then CPU"""
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
+def compile_for_training(model: nn.Module, device: torch.device) -> nn.Module:
+    """torch.compile the model for the fixed training shapes; checkpoints still come from model itself"""
+    compile_devices = {"0": (), "1": ("cuda", "cpu")}.get(TORCH_COMPILE, ("cuda",))
+    if device.type not in compile_devices:
+        return model
+    try:
+        return torch.compile(model, mode="reduce-overhead", fullgraph=False, dynamic=False, backend="inductor")
+    except Exception as e:
+        logger.warning(f"torch.compile unavailable, training eagerly: {e}")
+        return model
+
+
+def compile_errors_suppressed(step_model: nn.Module, model: nn.Module):
+    """Context for a training loop in which a graph that fails to compile runs eagerly instead of failing the job"""
+    if step_model is model:
+        return nullcontext()
+    import torch._dynamo
+    # Patched only while the loop runs, so compile errors elsewhere in the process still surface
+    return torch._dynamo.config.patch(suppress_errors=True)
@@ -2,10 +2,16 @@
 Word Validation Utilities
 Provides word validation with multiple fallback strategies
 """
+import logging
 import os
-import re
+import string
+from functools import lru_cache
+from threading import Lock
 from typing import List, Set
 
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 # Try to help PyEnchant find the system library on macOS (Homebrew path on Apple Silicon)
 for cand in ["/opt/homebrew/lib/libenchant-2.dylib", "/usr/local/lib/libenchant-2.dylib"]:
@@ -13,79 +19,80 @@ for cand in ["/opt/homebrew/lib/libenchant-2.dylib", "/usr/local/lib/libenchant-
         os.environ.setdefault("PYENCHANT_LIBRARY_PATH", cand)
         break
 
-# Common short words allowed
-ALLOWED_SHORT = {
-    "a", "i", "an", "in", "on", "to", "of", "is", "as", "at", 
-    "be", "he", "we", "us", "it", "or", "by"
-}
+# Common short words allowed; longer words go to the dictionary
+ALLOWED_SHORT = frozenset({
+    "a", "i", "an", "in", "on", "to", "of", "is", "as", "at", "be", "he", "we",
+    "us", "it", "or", "by", "so", "if", "me", "my", "up", "no", "do", "go"
+})
 
 # Common words fallback
-COMMON_WORDS = {
-    "the", "and", "to", "of", "in", "a", "that", "is", "it", "for", 
-    "on", "with", "as", "at", "by", "an", "be", "this", "was", "are",
-    "been", "have", "had", "were", "said", "each", "which", "she", "do",
-    "how", "their", "if", "will", "up", "other", "about", "out", "many",
-    "then", "them", "these", "so", "some", "her", "would", "make", "like",
-    "him", "into", "time", "has", "look", "two", "more", "write", "go"
-}
+COMMON_WORDS = frozenset({
+    "the", "and", "to", "of", "in", "a", "that", "is", "it", "for", "on", "with", "as", "at", "by", "an", "be",
+    "this", "was", "are", "have", "been", "from", "or", "had", "but", "what", "were", "we", "when", "there",
+    "can", "all", "your", "which", "their", "said", "if", "will", "do", "each", "about", "how", "up", "out",
+    "them", "then", "she", "many", "some", "so", "these", "would", "other", "into", "has", "more", "her", "two",
+    "like", "him", "see", "time", "could", "no", "just", "than", "only", "its", "now", "my", "over", "made",
+    "after", "also", "did", "years", "much", "way", "who", "through", "where", "back", "any", "our", "may",
+    "well", "down", "should", "because", "those", "people", "state", "very", "world", "still", "own",
+    "me", "work", "life", "being", "use", "day", "same", "part", "while", "he", "us", "go", "get", "come"
+})
+
+# Minimum wordfreq Zipf frequency for a word to count as English
+WORDFREQ_MIN_ZIPF = 3.0
+
+# Distinct lowercased words whose dictionary lookups are remembered
+LOOKUP_CACHE_SIZE = 65536
+
+# Every byte except ASCII letters and apostrophes, for deleting with bytes.translate
+_NON_WORD_BYTES = bytes(b for b in range(256) if chr(b) not in string.ascii_letters + "'")
+
+
+def _clean_word(word: str) -> str:
+    """Strip everything but ASCII letters and apostrophes from a word"""
+    return word.encode('ascii', 'ignore').translate(None, _NON_WORD_BYTES).decode('ascii')
 
 
 class WordValidator:
     """Word validation with multiple strategies"""
     
     def __init__(self):
-        self.validator_func = self._setup_validator()
+        self.checker_type, self.validator_func = self._setup_validator()
     
     def _setup_validator(self):
-        """Setup the best available validation strategy"""
+        """Setup the best available dictionary check for cleaned, lowercased words"""
         # Try PyEnchant first
         try:
             import enchant
             en_dict = enchant.Dict("en_US")
-            
-            def enchant_validator(word: str) -> bool:
-                clean = re.sub(r"[^A-Za-z']", "", word)
-                if not clean:
-                    return False
-                wl = clean.lower()
-                # Be strict about very short tokens
-                if len(wl) <= 2 and wl not in ALLOWED_SHORT:
-                    return False
-                return en_dict.check(wl)
-            
-            return enchant_validator
-            
-        except Exception:
-            pass
+            # Generated text repeats words heavily; answer repeats without crossing into enchant
+            return "enchant", lru_cache(maxsize=LOOKUP_CACHE_SIZE)(en_dict.check)
+        except Exception as e:
+            logger.warning(f"PyEnchant not available: {e}")
         
         # Try wordfreq as fallback
         try:
             from wordfreq import zipf_frequency
             
-            def wordfreq_validator(word: str) -> bool:
-                clean = re.sub(r"[^A-Za-z']", "", word).lower()
-                if not clean:
-                    return False
-                if len(clean) <= 2 and clean not in ALLOWED_SHORT:
-                    return False
-                # Use a conservative threshold; common English words have zipf >= ~3.5
-                return zipf_frequency(clean, "en") >= 3.3
+            @lru_cache(maxsize=LOOKUP_CACHE_SIZE)
+            def is_frequent(word: str) -> bool:
+                return zipf_frequency(word, "en") >= WORDFREQ_MIN_ZIPF
             
-            return wordfreq_validator
-            
-        except Exception:
-            pass
+            return "wordfreq", is_frequent
+        except Exception as e:
+            logger.warning(f"wordfreq not available: {e}")
         
         # Last resort: use common words whitelist
-        def basic_validator(word: str) -> bool:
-            wl = word.lower()
-            return wl in COMMON_WORDS or wl in ALLOWED_SHORT
-        
-        return basic_validator
+        return "basic", COMMON_WORDS.__contains__
     
     def check_word(self, word: str) -> bool:
         """Check if a word is valid"""
-        return self.validator_func(word)
+        clean = _clean_word(word).lower()
+        if not clean:
+            return False
+        # Be strict about very short tokens
+        if len(clean) <= 2:
+            return clean in ALLOWED_SHORT
+        return self.validator_func(clean)
     
     def validate_text(self, text: str) -> List[bool]:
         """Validate all words in text, returning mask of valid words"""
@@ -102,19 +109,24 @@ class WordValidator:
         words = text.split()
         if not words:
             return 100.0
-        valid_count = sum(1 for word in words if self.check_word(word))
-        return (valid_count / len(words)) * 100
+        valid_mask = np.fromiter(map(self.check_word, words), dtype=bool, count=len(words))
+        return float(valid_mask.mean() * 100)
 
 
 # Global instance
 _validator_instance = None
+_validator_lock = Lock()
 
 def get_validator() -> WordValidator:
     """Get or create validator instance"""
     global _validator_instance
-    if _validator_instance is None:
-        _validator_instance = WordValidator()
-    return _validator_instance
+    if _validator_instance is not None:
+        return _validator_instance
+    # Concurrent first calls (e.g. evaluation threads) must not each load a dictionary
+    with _validator_lock:
+        if _validator_instance is None:
+            _validator_instance = WordValidator()
+        return _validator_instance
 
 
 def check_word(word: str) -> bool:
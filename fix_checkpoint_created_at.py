@@ -7,6 +7,11 @@ import sqlite3
 import sys
 from pathlib import Path
 
+NEW_COLUMNS = [
+    "id", "created_at", "epochs", "block_size", "path", "notes",
+    "loss", "accuracy", "is_best", "training_job_id"
+]
+
 def fix_created_at():
     """Fix created_at column to have default timestamp"""
     db_path = Path(__file__).parent / "backend" / "james_llm.db"
@@ -17,17 +22,25 @@ def fix_created_at():
     
     print(f"Fixing neural_checkpoints table in: {db_path}")
     
-    conn = sqlite3.connect(str(db_path))
+    # Autocommit mode, so the explicit BEGIN below also covers the DDL statements
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    # Keep other tables' foreign keys pointing at neural_checkpoints across the rename below
+    conn.execute("PRAGMA legacy_alter_table=ON")
     cursor = conn.cursor()
     
     try:
-        # SQLite doesn't support ALTER COLUMN, so we need to recreate the table
-        # First, backup the existing data
-        cursor.execute("SELECT * FROM neural_checkpoints")
-        existing_data = cursor.fetchall()
+        # One transaction for the whole run: a single commit, and nothing half-applied on error
+        cursor.execute("BEGIN IMMEDIATE")
         
-        # Drop the old table
-        cursor.execute("DROP TABLE IF EXISTS neural_checkpoints")
+        # SQLite doesn't support ALTER COLUMN, so we need to recreate the table
+        # First, move the existing table aside as the backup
+        cursor.execute("PRAGMA table_info(neural_checkpoints)")
+        existing_columns = {row[1] for row in cursor.fetchall()}
+        cursor.execute("ALTER TABLE neural_checkpoints RENAME TO neural_checkpoints_old")
         
         # Create the new table with proper defaults
         cursor.execute("""
@@ -46,23 +59,22 @@ def fix_created_at():
             )
         """)
         
+        # Copy the rows across inside SQLite; columns the old schema lacked take their defaults
+        columns = [c for c in NEW_COLUMNS if c in existing_columns]
+        selected = ["COALESCE(created_at, CURRENT_TIMESTAMP)" if c == "created_at" else c for c in columns]
+        cursor.execute(f"""
+            INSERT INTO neural_checkpoints ({", ".join(columns)})
+            SELECT {", ".join(selected)} FROM neural_checkpoints_old
+        """)
+        
+        # Drop the backup, which also frees its index names for the new table
+        cursor.execute("DROP TABLE neural_checkpoints_old")
+        
         # Create indexes
         cursor.execute("CREATE INDEX idx_neural_checkpoints_created_at ON neural_checkpoints(created_at)")
         cursor.execute("CREATE INDEX idx_neural_checkpoints_is_best ON neural_checkpoints(is_best)")
         cursor.execute("CREATE INDEX idx_neural_checkpoints_training_job ON neural_checkpoints(training_job_id)")
         
-        # Restore existing data if any
-        if existing_data:
-            for row in existing_data:
-                # Adjust for new columns (add defaults for missing ones)
-                if len(row) < 10:  # Old schema had fewer columns
-                    row = list(row) + [None] * (10 - len(row))
-                cursor.execute("""
-                    INSERT INTO neural_checkpoints 
-                    (id, created_at, epochs, block_size, path, notes, loss, accuracy, is_best, training_job_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, row)
-        
         conn.commit()
         print("Successfully fixed neural_checkpoints table!")
         
@@ -17,10 +17,18 @@ def migrate_database():
     
     print(f"Migrating backend database: {db_path}")
     
-    conn = sqlite3.connect(str(db_path))
+    # Autocommit mode, so the explicit BEGIN below also covers the DDL statements
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
     cursor = conn.cursor()
     
     try:
+        # One transaction for the whole run: a single commit, and nothing half-applied on error
+        cursor.execute("BEGIN")
+        
         # Create training_jobs table if it doesn't exist
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS training_jobs (
@@ -2,38 +2,58 @@
 """
 Test script to verify block-by-block training works correctly
 """
+import argparse
 import sys
 import os
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+DATABASE_PATH = os.path.join(BACKEND_DIR, 'james_llm.db')
 
 # Set the backend path and database path
-backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
-sys.path.insert(0, backend_path)
+sys.path.insert(0, BACKEND_DIR)
 
 # Set the database path to use the backend database
-os.environ['DATABASE_PATH'] = os.path.join(backend_path, 'james_llm.db')
+os.environ['DATABASE_PATH'] = DATABASE_PATH
 
 from services.training_service import train_with_persistence
 
-def test_block_training():
+BLOCK_SIZE = 1000  # Small blocks for testing
+BATCH_SIZE = 16
+EPOCHS = 2
+REPEAT_TEXT = 100
+
+# (block_size, batch_size) configurations timed by --benchmark
+BENCHMARK_CONFIGS = [(512, 8), (1000, 16), (2048, 32)]
+
+TEST_PHRASE = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG "  # 44 characters
+
+def iter_blocks(text, block_size):
+    """Yield the blocks train_with_persistence splits text into, one slice at a time"""
+    return (text[i:i + block_size] for i in range(0, len(text), block_size))
+
+def test_block_training(block_size=BLOCK_SIZE, batch_size=BATCH_SIZE, epochs=EPOCHS, repeat_text=REPEAT_TEXT):
     """Test that training processes text block by block"""
     
     # Create test text that will be split into multiple blocks
-    # Using a block size of 1000 characters for testing
-    test_text = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG " * 100  # ~4500 characters
+    # Using a block size of block_size characters for testing
+    test_text = TEST_PHRASE * repeat_text
     
     print(f"Test text length: {len(test_text)} characters")
-    print("Testing with block_size=1000, epochs=2")
+    print(f"Testing with block_size={block_size}, batch_size={batch_size}, epochs={epochs}, repeat_text={repeat_text}")
     print("-" * 50)
     
     def progress_callback(progress, message):
-        print(f"[{progress:3d}%] {message}")
+        sys.stdout.write(f"[{progress:3d}%] {message}\n")
     
     try:
         checkpoint_path, stats = train_with_persistence(
             text=test_text,
-            block_size=1000,  # Small blocks for testing
-            epochs=2,  # 2 epochs per block
-            batch_size=16,
+            block_size=block_size,
+            epochs=epochs,
+            batch_size=batch_size,
             learning_rate=1e-3,
             progress_callback=progress_callback
         )
@@ -47,12 +67,16 @@ def test_block_training():
         print(f"  Total training steps: {stats['total_steps']}")
         print(f"  Final loss: {stats['final_loss']:.4f}")
         print(f"  Device used: {stats['device']}")
+        print(f"  Parameters: block_size={stats['block_size']}, batch_size={stats['batch_size']}, "
+              f"learning_rate={stats['learning_rate']}, repeat_text={repeat_text}")
         
-        if 'block_losses' in stats:
-            print(f"\nBlock losses: {[f'{loss:.4f}' for loss in stats['block_losses']]}")
+        if stats.get('block_losses'):
+            losses = np.asarray(stats['block_losses'], dtype=np.float32)
+            print(f"\nBlock losses: {np.array2string(losses, precision=4, max_line_width=120)}")
+            print(f"  Mean: {losses.mean():.4f}, min: {losses.min():.4f} (trained block {int(losses.argmin()) + 1})")
         
         # Verify that we processed the expected number of blocks
-        expected_blocks = (len(test_text) + 999) // 1000  # Ceiling division
+        expected_blocks = sum(1 for _ in iter_blocks(test_text, block_size))
         assert stats['total_blocks'] == expected_blocks, f"Expected {expected_blocks} blocks, got {stats['total_blocks']}"
         print(f"\n✓ Verified: Processed {expected_blocks} blocks as expected")
         
@@ -71,8 +95,38 @@ def test_block_training():
     
     return True
 
+def benchmark_block_training(epochs=EPOCHS, repeat_text=REPEAT_TEXT):
+    """Time one verified training run per BENCHMARK_CONFIGS entry, to catch training-speed regressions"""
+    timings = []
+    for block_size, batch_size in BENCHMARK_CONFIGS:
+        start = time.perf_counter()
+        if not test_block_training(block_size, batch_size, epochs, repeat_text):
+            return False
+        timings.append((block_size, batch_size, time.perf_counter() - start))
+    
+    print("\nBenchmark results:")
+    print("  block_size  batch_size   seconds")
+    for block_size, batch_size, seconds in timings:
+        print(f"  {block_size:10d}  {batch_size:10d}  {seconds:8.2f}")
+    return True
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verify block-by-block training")
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help="characters per training block")
+    parser.add_argument('--epochs', type=int, default=EPOCHS, help="epochs per block")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--repeat-text', type=int, default=REPEAT_TEXT,
+                        help=f"times the {len(TEST_PHRASE)}-character test phrase is repeated")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="time every BENCHMARK_CONFIGS entry instead (ignores --block-size/--batch-size)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     print("Testing Block-by-Block Training Implementation")
     print("=" * 50)
-    success = test_block_training()
+    if args.benchmark:
+        success = benchmark_block_training(args.epochs, args.repeat_text)
+    else:
+        success = test_block_training(args.block_size, args.batch_size, args.epochs, args.repeat_text)
     sys.exit(0 if success else 1)
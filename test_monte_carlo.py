@@ -3,24 +3,76 @@
 Test script to verify Monte Carlo generation and PyEnchant validation
 """
 
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
+from itertools import compress, islice
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # API endpoint
 API_URL = "http://localhost:5001/api/generate"
+BATCH_API_URL = "http://localhost:5001/api/generate_batch"
+HEALTH_URL = "http://localhost:5001/health"
+
+# Seconds to wait: a generation, the warm-up (which loads the models) and a whole batch
+REQUEST_TIMEOUT = 30
+WARMUP_TIMEOUT = 60
+BATCH_TIMEOUT = 120
+
+# orjson encodes and decodes the request/response bodies much faster; fall back to the stdlib
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+    _json_loads = json.loads
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# One keep-alive connection pool for every request, sized for the concurrent fallback
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0))
+
+def server_ready():
+    """Quick health probe, so a server that is down fails fast instead of hanging"""
+    try:
+        return SESSION.get(HEALTH_URL, timeout=1).ok
+    except requests.RequestException:
+        return False
+
+def _timed_post(url, payload, timeout=REQUEST_TIMEOUT):
+    """POST payload to url, returning (response, seconds taken)"""
+    start = time.perf_counter()
+    response = SESSION.post(url, data=_json_dumps(payload), headers=JSON_HEADERS, timeout=timeout)
+    return response, time.perf_counter() - start
+
+def warmup():
+    """Make the backend load its models now, so later timings are steady-state"""
+    print("Warming up backend...")
+    try:
+        _, elapsed = _timed_post(API_URL, {"temperature": 1.0, "max_tokens": 1}, timeout=WARMUP_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"Warm-up failed: {e}")
+        return False
+    print(f"Warm-up request took {elapsed*1000:.0f} ms")
+    return True
 
 def test_single_generation():
     """Test a single generation to see the response format"""
     print("Testing single generation...")
     
-    response = requests.post(API_URL, json={
+    response, elapsed = _timed_post(API_URL, {
         "temperature": 1.0,
         "max_tokens": 100
     })
     
     if response.status_code == 200:
-        data = response.json()
+        data = _json_loads(response.content)
         text = data.get("generated_text", "")
         valid_mask = data.get("valid_mask", [])
         
@@ -28,6 +80,7 @@ def test_single_generation():
         valid_count = sum(valid_mask)
         total_words = len(valid_mask)
         
+        print(f"Latency: {elapsed*1000:.0f} ms")
         print(f"Generated text: {text[:100]}...")
         print(f"Words generated: {len(words)}")
         print(f"Valid mask length: {total_words}")
@@ -37,9 +90,12 @@ def test_single_generation():
         
         # Show word-by-word validation
         print("\nWord validation details:")
-        for i, (word, valid) in enumerate(zip(words[:10], valid_mask[:10])):
-            status = "✓" if valid else "✗"
-            print(f"  {status} {word}")
+        print("\n".join(
+            f"  {'✓' if valid else '✗'} {word}"
+            for word, valid in islice(zip(words, valid_mask), 10)
+        ))
+        invalid_words = list(compress(words, (not valid for valid in valid_mask)))
+        print(f"Invalid words: {' '.join(invalid_words) if invalid_words else '(none)'}")
         
         return True
     else:
@@ -47,59 +103,108 @@ def test_single_generation():
         print(response.text)
         return False
 
-def test_monte_carlo_simulation(num_runs=10):
-    """Run a mini Monte Carlo simulation"""
+def _generate_once():
+    """One timed generation request for the simulation"""
+    return _timed_post(API_URL, {
+        "temperature": 1.0,
+        "max_tokens": 50
+    })
+
+def _generate_batch(num_runs):
+    """
+    Every run's valid mask from one batched request, with the request's latency
+    Returns (None, []) if the server has no batch endpoint
+    """
+    response, elapsed = _timed_post(BATCH_API_URL, {
+        "runs": num_runs,
+        "temperature": 1.0,
+        "max_tokens": 50
+    }, timeout=BATCH_TIMEOUT)
+    if response.status_code == 404:
+        return None, []
+    response.raise_for_status()
+    return [r.get("valid_mask", []) for r in _json_loads(response.content)["results"]], [elapsed]
+
+def _generate_concurrently(num_runs, max_concurrency):
+    """
+    Run i's valid mask (None if its request failed), keeping up to max_concurrency
+    requests in flight; also returns each successful request's latency
+    """
+    masks = [None] * num_runs
+    latencies = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = {pool.submit(_generate_once): i for i in range(num_runs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                response, elapsed = future.result()
+            except requests.RequestException as e:
+                print(f"Run {i+1}/{num_runs}: error: {e}")
+                continue
+            if response.status_code == 200:
+                masks[i] = _json_loads(response.content).get("valid_mask", [])
+                latencies.append(elapsed)
+            else:
+                print(f"Run {i+1}/{num_runs}: error: {response.status_code}")
+    return masks, latencies
+
+def test_monte_carlo_simulation(num_runs=10, max_concurrency=None):
+    """Run a mini Monte Carlo simulation, batched on the server when it supports it"""
     print(f"\n\nRunning Monte Carlo simulation with {num_runs} runs...")
     
+    masks, latencies = _generate_batch(num_runs)
+    if masks is None:
+        print("No batch endpoint; sending runs as concurrent requests")
+        masks, latencies = _generate_concurrently(num_runs, max_concurrency or min(num_runs, 16))
+    
     results = []
-    for i in range(num_runs):
+    for i, valid_mask in enumerate(masks):
+        if valid_mask is None:
+            continue
         print(f"Run {i+1}/{num_runs}...", end=" ")
+        valid_count = int(np.count_nonzero(valid_mask))
+        total_words = len(valid_mask)
         
-        response = requests.post(API_URL, json={
-            "temperature": 1.0,
-            "max_tokens": 50
-        })
-        
-        if response.status_code == 200:
-            data = response.json()
-            valid_mask = data.get("valid_mask", [])
-            valid_count = sum(valid_mask)
-            total_words = len(valid_mask)
-            
-            if total_words > 0:
-                valid_percentage = (valid_count / total_words) * 100
-                results.append(valid_percentage)
-                print(f"{valid_percentage:.1f}% valid")
-            else:
-                print("No words generated")
+        if total_words > 0:
+            valid_percentage = (valid_count / total_words) * 100
+            results.append(valid_percentage)
+            print(f"{valid_percentage:.1f}% valid")
         else:
-            print(f"Error: {response.status_code}")
-        
-        time.sleep(0.1)  # Small delay between requests
+            print("No words generated")
     
     if results:
+        scores = np.fromiter(results, dtype=np.float32, count=len(results))
         print(f"\n\nResults Summary:")
-        print(f"  Mean: {sum(results)/len(results):.1f}%")
-        print(f"  Min: {min(results):.1f}%")
-        print(f"  Max: {max(results):.1f}%")
+        print(f"  Mean: {scores.mean():.1f}%")
+        print(f"  Min: {scores.min():.1f}%")
+        print(f"  Max: {scores.max():.1f}%")
+        
+        # Latency is reported apart from validity, per HTTP request
+        latency_ms = np.asarray(latencies) * 1000
+        print(f"\nRequest latency ({len(latency_ms)} requests for {num_runs} runs):")
+        print(f"  Mean: {latency_ms.mean():.0f} ms")
+        print(f"  Min: {latency_ms.min():.0f} ms")
+        print(f"  Max: {latency_ms.max():.0f} ms")
         
-        # Create simple histogram
-        print("\nHistogram (10% bins):")
-        bins = {}
-        for r in results:
-            bin_idx = int(r // 10) * 10
-            bins[bin_idx] = bins.get(bin_idx, 0) + 1
+        # Create simple histogram; 100% goes in the top bin
+        bins = np.bincount(np.clip((scores // 10).astype(np.int64), 0, 9), minlength=10)
         
-        for i in range(0, 100, 10):
-            count = bins.get(i, 0)
-            bar = "█" * count
-            print(f"  {i:3d}-{i+9:3d}%: {bar} ({count})")
+        lines = ["\nHistogram (10% bins):"]
+        for i, count in enumerate(bins.tolist()):
+            low = i * 10
+            high = 100 if i == 9 else low + 9
+            lines.append(f"  {low:3d}-{high:3d}%: {'█' * count} ({count})")
+        print("\n".join(lines))
 
 if __name__ == "__main__":
     print("Monte Carlo Test Script")
     print("=" * 50)
     
-    if test_single_generation():
+    if not server_ready():
+        print(f"Backend not reachable at {HEALTH_URL}. Check if backend is running.")
+        sys.exit(1)
+    
+    if warmup() and test_single_generation():
         test_monte_carlo_simulation(20)
     else:
         print("Single generation test failed. Check if backend is running.")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test script to verify /api/generate and Monte Carlo evaluation score words the same way
+"""
+import sys
+import os
+
+# Project root, so the backend imports as the `backend` package like app.py expects
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_ROOT)
+
+from backend.app import _check_word
+from backend.services.evaluation_service import validate_words
+
+# Dictionary words, short words on and off the allow-list, punctuation and non-words
+TEST_TEXT = "THE QUICK BROWN FOX so NO GO MY ZZ QX A I DOG. don't HELLO, café XQZV THEIR ''"
+
+def test_scoring_paths_agree(text=TEST_TEXT):
+    """The generate endpoints' valid_mask must equal the Monte Carlo mask for the same words"""
+    words = text.split()
+    endpoint_mask = [_check_word(w) for w in words]
+    evaluation_mask, validity_percentage = validate_words(text)
+
+    for word, endpoint, evaluation in zip(words, endpoint_mask, evaluation_mask.tolist()):
+        print(f"  {word!r:12} generate={endpoint!s:5} monte_carlo={evaluation}")
+
+    assert evaluation_mask.tolist() == endpoint_mask, "Monte Carlo and /api/generate disagree"
+    expected_percentage = 100 * sum(endpoint_mask) / len(words)
+    assert abs(validity_percentage - expected_percentage) < 1e-9, "Validity percentage does not match the mask"
+
+    # Short words: the allow-list decides, whichever dictionary is installed
+    assert all(_check_word(w) for w in ["so", "NO", "go", "MY", "A", "I"])
+    assert not any(_check_word(w) for w in ["ZZ", "QX", "''", "..."])
+    print(f"\n✓ Verified: both paths agree on {len(words)} words ({validity_percentage:.1f}% valid)")
+
+if __name__ == "__main__":
+    print("Testing Word Validation Consistency")
+    print("=" * 50)
+    try:
+        test_scoring_paths_agree()
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+    print("\n✅ All tests passed!")